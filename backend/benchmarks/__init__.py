@@ -0,0 +1,57 @@
+"""Бенчмарки API foodgram.
+
+Каждый сценарий запускается как модуль, например
+``python -m benchmarks.shopping_list``. Тестовые данные создаются внутри
+транзакции, которая откатывается по завершении замера, а файлы - во
+временном каталоге, который удаляется. Ограничение частоты запросов на
+время замеров отключается.
+
+``benchmarks.scenarios`` замеряет основные запросы API на базе,
+заполненной командой ``seed_data``, и сохраняет отчёт в JSON;
+``benchmarks.compare`` сравнивает два таких отчёта;
+``benchmarks.async_reads`` сравнивает чтение под WSGI и ASGI при
+медленной базе данных; ``benchmarks.throttling`` замеряет накладные
+расходы ограничения частоты запросов.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import django
+from django.apps import apps
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# Повторный django.setup() заново настраивает журналы, например при
+# импорте пакета поиском тестов
+if not apps.ready:
+    django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+
+class Rollback(Exception):
+    """Исключение для отката транзакции с тестовыми данными"""
+
+
+@contextmanager
+def rollback():
+    """Выполняет блок в транзакции и откатывает все изменения.
+
+    Загруженные файлы сохраняются во временный MEDIA_ROOT, который
+    удаляется вместе с ними: откат транзакции файлы не трогает.
+    Ограничение частоты отключено, иначе повторы сценария упираются
+    в 429.
+    """
+    media_root = tempfile.mkdtemp()
+    try:
+        with override_settings(MEDIA_ROOT=media_root,
+                               THROTTLE_ENABLED=False), \
+                transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
@@ -0,0 +1,178 @@
+"""Чтение под WSGI и ASGI при медленной базе данных.
+
+Перед запуском заполните базу: python manage.py seed_data
+Запуск: python -m benchmarks.async_reads --latency 20 --concurrency 32
+
+Каждый запрос к БД задерживается на --latency миллисекунд, как при
+удалённой или нагруженной базе. Запросы отправляются волнами по
+--concurrency одновременно. Под WSGI их обрабатывают --threads потоков,
+как воркер gthread; под ASGI - асинхронные представления в одном
+цикле событий, запросы к БД идут в пул из --pool потоков. Задержка
+запроса считается от начала волны, поэтому включает ожидание в очереди.
+При малой задержке оба варианта упираются в процессор, и выигрыша нет.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.scenarios import get_user
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment
+from recipes.models import Ingredient, Recipe
+from rest_framework.authtoken.models import Token
+
+
+class SlowDatabase:
+    """Execute wrapper, задерживающий каждый запрос к БД"""
+    def __init__(self, latency):
+        self.latency = latency
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def scenarios(token):
+    """Адреса сценариев, бесконечные последовательности (url, заголовки)"""
+    recipes = Recipe.objects.order_by('-id').values_list('id', flat=True)
+    names = Ingredient.objects.order_by('?').values_list('name', flat=True)
+    auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+    return {
+        'recipe_list': ((f'/api/recipes/?page={page}', {})
+                        for page in itertools.cycle(range(1, 11))),
+        'recipe_detail': ((f'/api/recipes/{pk}/', {})
+                          for pk in itertools.cycle(list(recipes[:100]))),
+        'tags': itertools.repeat(('/api/tags/', {})),
+        'ingredient_autocomplete': (
+            (f'/api/ingredients/?name={name[:3]}', {})
+            for name in itertools.cycle(list(names[:50]))
+        ),
+        'subscriptions': itertools.repeat(
+            ('/api/users/subscriptions/?recipes_limit=3', auth)
+        ),
+    }
+
+
+def check(response, url):
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: {response.status_code}')
+
+
+def run_wsgi(waves, threads):
+    local = threading.local()
+
+    def get(url, headers, started):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        check(local.client.get(url, **headers), url)
+        return time.perf_counter() - started
+
+    timings = []
+    with ThreadPoolExecutor(threads) as executor:
+        for wave in waves:
+            started = time.perf_counter()
+            timings.extend(executor.map(
+                lambda request: get(*request, started), wave
+            ))
+    return timings
+
+
+def run_asgi(waves, pool):
+    async def get(url, headers, started):
+        # AsyncClient передаёт заголовки без префикса HTTP_
+        headers = {key[5:].lower().replace('_', '-'): value
+                   for key, value in headers.items()}
+        check(await AsyncClient().get(url, **headers), url)
+        return time.perf_counter() - started
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(pool))
+        timings = []
+        for wave in waves:
+            started = time.perf_counter()
+            timings.extend(await asyncio.gather(
+                *(get(*request, started) for request in wave)
+            ))
+        return timings
+
+    with override_settings(ROOT_URLCONF='foodgram.asgi_urls',
+                           ASYNC_DB_CONCURRENCY=True):
+        return asyncio.run(main())
+
+
+def report(timings, elapsed):
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1000, 1),
+        'p95_ms': round(quantiles[94] * 1000, 1),
+        'p99_ms': round(quantiles[98] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenario', action='append',
+                        choices=('recipe_list', 'recipe_detail', 'tags',
+                                 'ingredient_autocomplete', 'subscriptions'),
+                        help='Сценарий; по умолчанию все')
+    parser.add_argument('--latency', type=float, default=20,
+                        help='Задержка каждого запроса к БД, мс')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--waves', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Потоков воркера WSGI')
+    parser.add_argument('--pool', type=int, default=32,
+                        help='Потоков пула запросов к БД под ASGI')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    logging.getLogger('foodgram.requests').setLevel(logging.ERROR)
+    user = get_user()
+    token, created = Token.objects.get_or_create(user=user)
+    slow = SlowDatabase(args.latency / 1000)
+    connection_created.connect(slow.install)
+    for connection in connections.all():
+        slow.install(connection)
+    # Повторы автодополнения иначе упираются в частоту класса search
+    throttling = override_settings(THROTTLE_ENABLED=False)
+    throttling.enable()
+    try:
+        available = scenarios(token)
+        for name in args.scenario or available:
+            requests = available[name]
+            results = {}
+            for mode, run, workers in (('wsgi', run_wsgi, args.threads),
+                                       ('asgi', run_asgi, args.pool)):
+                waves = [list(itertools.islice(requests, args.concurrency))
+                         for _ in range(args.waves)]
+                started = time.perf_counter()
+                timings = run(waves, workers)
+                results[mode] = report(timings,
+                                       time.perf_counter() - started)
+            for mode, result in results.items():
+                print(f'{name:<25} {mode}  {result["rps"]:>8.1f} req/s  '
+                      f'p50 {result["p50_ms"]:>8.1f} ms  '
+                      f'p95 {result["p95_ms"]:>8.1f} ms  '
+                      f'p99 {result["p99_ms"]:>8.1f} ms')
+    finally:
+        throttling.disable()
+        connection_created.disconnect(slow.install)
+        if created:
+            token.delete()
+
+
+if __name__ == '__main__':
+    main()
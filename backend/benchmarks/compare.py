@@ -0,0 +1,65 @@
+"""Сравнение двух JSON-отчётов benchmarks.scenarios.
+
+Запуск: python -m benchmarks.compare before.json after.json --threshold 10
+
+Для каждого сценария печатает изменение метрик в процентах. Код выхода 1,
+если какая-либо метрика выросла больше чем на --threshold процентов или
+выросло число запросов к БД.
+"""
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_alloc_kib')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def change(before, after):
+    if not before:
+        return 0.0 if not after else float('inf')
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    """Возвращает строки отчёта и список регрессий"""
+    lines = []
+    regressions = []
+    for name, new in after['scenarios'].items():
+        old = before['scenarios'].get(name)
+        if old is None:
+            lines.append(f'{name}: нет в исходном отчёте')
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = change(old[metric], new[metric])
+            cells.append(f'{metric} {old[metric]} -> {new[metric]} '
+                         f'({delta:+.1f}%)')
+            limit = 0 if metric == 'queries' else threshold
+            if delta > limit:
+                regressions.append(f'{name}.{metric}')
+        lines.append(f'{name}: ' + ', '.join(cells))
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='Допустимый рост метрики в процентах')
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    print(f'{before["meta"]["revision"]} -> {after["meta"]["revision"]}')
+    lines, regressions = compare(before, after, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print('Регрессии: ' + ', '.join(regressions))
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
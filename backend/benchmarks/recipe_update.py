@@ -0,0 +1,85 @@
+"""Редактирование рецепта из 50 ингредиентов: запросы и задержка.
+
+Запуск: python -m benchmarks.recipe_update --ingredients 50 --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import rollback
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.views import RecipeViewSet
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import CustomUser
+
+
+def seed(ingredients_count):
+    author = CustomUser.objects.create(
+        email='bench@bench.ru', username='bench',
+        first_name='Bench', last_name='Bench'
+    )
+    tags = [
+        Tag.objects.create(name=f'bench {color}', slug=f'bench{number}',
+                           color=color)
+        for number, (color, _) in enumerate(Tag.COLOR_CHOICES[:3])
+    ]
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'bench ингредиент {number}', measurement_unit='г')
+        for number in range(ingredients_count)
+    )
+    recipe = Recipe.objects.create(
+        author=author, name='bench', text='bench', cooking_time=10
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    )
+    return author, recipe, tags, ingredients
+
+
+def patch(author, recipe, tags, ingredients, amount):
+    data = {
+        'name': recipe.name, 'text': recipe.text, 'cooking_time': 10,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount if index == 0 else 1}
+            for index, ingredient in enumerate(ingredients)
+        ],
+    }
+    request = APIRequestFactory().patch(
+        f'/api/recipes/{recipe.id}/', data, format='json'
+    )
+    force_authenticate(request, user=author)
+    view = RecipeViewSet.as_view({'patch': 'partial_update'})
+    response = view(request, pk=recipe.id)
+    assert response.status_code == 200, response.data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ingredients', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with rollback():
+        author, recipe, tags, ingredients = seed(args.ingredients)
+        timings = []
+        queries = []
+        for number in range(args.repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                patch(author, recipe, tags, ingredients, number + 2)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(context.captured_queries))
+
+    print(f'ingredients:     {args.ingredients}')
+    print(f'queries/update:  {statistics.median(queries):.0f}')
+    print(f'median latency:  {statistics.median(timings) * 1000:.1f} ms')
+    print(f'best latency:    {min(timings) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""Сценарные бенчмарки API на текущей базе данных.
+
+Перед запуском заполните базу: python manage.py seed_data
+Запуск: python -m benchmarks.scenarios --repeat 200 --output bench.json
+
+Запросы проходят весь стек middleware через тестовый клиент Django.
+Для каждого сценария считаются задержки p50/p95/p99, число запросов
+к БД и пиковый объём памяти, выделенной за один запрос. Изменения
+сценариев create и update откатываются вместе с остальными данными.
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks import rollback
+from django import get_version
+from django.db import connection
+from django.test.utils import setup_test_environment
+from foodgram.instrumentation import RequestStats
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import CustomUser
+
+
+class Scenario:
+    """Набор запросов одного сценария.
+
+    request() выполняет очередной запрос и возвращает ответ; при каждом
+    вызове используются следующие по кругу параметры.
+    """
+    name = None
+
+    def __init__(self, client, user):
+        self.client = client
+        self.user = user
+
+    def request(self):
+        raise NotImplementedError
+
+
+class RecipeList(Scenario):
+    name = 'recipe_list'
+
+    def __init__(self, client, user):
+        super().__init__(client, user)
+        self.pages = itertools.cycle(range(1, 11))
+
+    def request(self):
+        return self.client.get('/api/recipes/', {'page': next(self.pages)})
+
+
+class RecipeDetail(Scenario):
+    name = 'recipe_detail'
+
+    def __init__(self, client, user):
+        super().__init__(client, user)
+        self.ids = itertools.cycle(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)[:100]
+        )
+
+    def request(self):
+        return self.client.get(f'/api/recipes/{next(self.ids)}/')
+
+
+class Subscriptions(Scenario):
+    name = 'subscriptions'
+
+    def request(self):
+        return self.client.get('/api/users/subscriptions/',
+                               {'recipes_limit': 3})
+
+
+class DownloadShoppingCart(Scenario):
+    name = 'download_shopping_cart'
+
+    def request(self):
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        b''.join(response.streaming_content)
+        return response
+
+
+class IngredientAutocomplete(Scenario):
+    name = 'ingredient_autocomplete'
+
+    def __init__(self, client, user):
+        super().__init__(client, user)
+        names = Ingredient.objects.order_by('?').values_list(
+            'name', flat=True)[:50]
+        self.prefixes = itertools.cycle(
+            sorted({name[:length] for name in names for length in (1, 3)})
+        )
+
+    def request(self):
+        return self.client.get('/api/ingredients/',
+                               {'name': next(self.prefixes)})
+
+
+class RecipeCreate(Scenario):
+    name = 'recipe_create'
+
+    def __init__(self, client, user):
+        super().__init__(client, user)
+        self.numbers = itertools.count()
+        self.tags = list(Tag.objects.values_list('id', flat=True)[:2])
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:8]
+        )
+
+    def data(self, number):
+        return {
+            'name': f'bench {number}',
+            'text': 'bench',
+            'cooking_time': 10 + number % 50,
+            'tags': self.tags,
+            'ingredients': [
+                {'id': ingredient, 'amount': number % 7 + 1}
+                for ingredient in self.ingredients
+            ],
+            'image': IMAGE,
+        }
+
+    def request(self):
+        return self.client.post('/api/recipes/',
+                                self.data(next(self.numbers)), format='json')
+
+
+class RecipeUpdate(RecipeCreate):
+    name = 'recipe_update'
+
+    def __init__(self, client, user):
+        super().__init__(client, user)
+        response = self.client.post('/api/recipes/', self.data(-1),
+                                    format='json')
+        self.recipe = response.data['id']
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:12]
+        )
+
+    def request(self):
+        number = next(self.numbers)
+        data = self.data(number)
+        # Каждый раз часть ингредиентов удаляется, часть добавляется
+        data['ingredients'] = data['ingredients'][number % 4:][:8]
+        data['name'] = f'bench update {number}'
+        return self.client.patch(f'/api/recipes/{self.recipe}/', data,
+                                 format='json')
+
+
+# Прозрачный GIF 1x1
+IMAGE = ('data:image/gif;base64,'
+         'R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+SCENARIOS = {scenario.name: scenario for scenario in (
+    RecipeList, RecipeDetail, Subscriptions, DownloadShoppingCart,
+    IngredientAutocomplete, RecipeCreate, RecipeUpdate,
+)}
+
+
+def percentile(quantiles, number):
+    return round(quantiles[number - 1] * 1000, 2)
+
+
+def measure(scenario, repeat, warmup):
+    """Прогоняет сценарий: сначала замер времени и запросов, затем
+    отдельный проход с tracemalloc, который замедляет выполнение"""
+    for _ in range(warmup):
+        scenario.request()
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        stats = RequestStats()
+        with connection.execute_wrapper(stats):
+            started = time.perf_counter()
+            response = scenario.request()
+            timings.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{scenario.name}: {response.status_code} {response.content}'
+            )
+        queries.append(stats.queries)
+    allocations = []
+    for _ in range(min(repeat, 20)):
+        tracemalloc.start()
+        scenario.request()
+        allocations.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'requests': repeat,
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 2),
+        'queries': statistics.median_high(queries),
+        'max_queries': max(queries),
+        'peak_alloc_kib': round(statistics.median(allocations) / 1024, 1),
+    }
+
+
+def get_user():
+    """Автор с наибольшим числом рецептов среди пользователей
+    с подписками и списком покупок"""
+    user = CustomUser.objects.filter(
+        follower__isnull=False, shopping_cart__isnull=False
+    ).order_by('-recipes_count', 'id').first()
+    if user is None:
+        raise SystemExit('База пуста, выполните manage.py seed_data')
+    return user
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenario', action='append',
+                        choices=sorted(SCENARIOS),
+                        help='Сценарий; по умолчанию все')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    args = parser.parse_args()
+
+    # Разрешает хост testserver и убирает построчный журнал запросов
+    setup_test_environment()
+    logging.getLogger('foodgram.requests').setLevel(logging.ERROR)
+    results = {}
+    with rollback():
+        user = get_user()
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for name in args.scenario or SCENARIOS:
+            scenario = SCENARIOS[name](client, user)
+            results[name] = measure(scenario, args.repeat, args.warmup)
+            print(f'{name:<25} p50 {results[name]["p50_ms"]:>8.2f} ms  '
+                  f'p95 {results[name]["p95_ms"]:>8.2f} ms  '
+                  f'p99 {results[name]["p99_ms"]:>8.2f} ms  '
+                  f'queries {results[name]["queries"]:>3}  '
+                  f'alloc {results[name]["peak_alloc_kib"]:>8.1f} KiB')
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': get_version(),
+            'users': CustomUser.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'recipe_ingredients': RecipeIngredient.objects.count(),
+        },
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
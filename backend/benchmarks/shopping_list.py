@@ -0,0 +1,95 @@
+"""Пропускная способность выгрузки списка покупок.
+
+Запуск: python -m benchmarks.shopping_list --recipes 1000 --format txt
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import rollback
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from recipes.views import RecipeViewSet
+from rest_framework.test import APIRequestFactory, force_authenticate
+from users.models import CustomUser
+
+
+def seed(recipes, ingredients_per_recipe, ingredients_total):
+    user = CustomUser.objects.create(
+        email='bench@bench.ru', username='bench',
+        first_name='Bench', last_name='Bench'
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(ingredients_total)
+    )
+    recipe_objects = Recipe.objects.bulk_create(
+        Recipe(author=user, name=f'рецепт {number}',
+               text='описание', cooking_time=10)
+        for number in range(recipes)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[
+                (number + offset) % ingredients_total],
+            amount=offset + 1
+        )
+        for number, recipe in enumerate(recipe_objects)
+        for offset in range(ingredients_per_recipe)
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe) for recipe in recipe_objects
+    )
+    return user
+
+
+def download(user, export_format):
+    request = APIRequestFactory().get(
+        '/api/recipes/download_shopping_cart/', {'format': export_format}
+    )
+    force_authenticate(request, user=user)
+    view = RecipeViewSet.as_view(
+        {'get': 'download_shopping_cart'},
+        **RecipeViewSet.download_shopping_cart.kwargs
+    )
+    response = view(request)
+    lines = size = 0
+    for chunk in response.streaming_content:
+        lines += 1
+        size += len(chunk)
+    return lines, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--format', default='txt')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with rollback():
+        user = seed(args.recipes, args.ingredients_per_recipe,
+                    args.ingredients)
+        timings = []
+        tracemalloc.start()
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            lines, size = download(user, args.format)
+            timings.append(time.perf_counter() - started)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    best = min(timings)
+    print(f'recipes in cart:  {args.recipes}')
+    print(f'format:           {args.format}')
+    print(f'chunks:           {lines}')
+    print(f'bytes:            {size}')
+    print(f'best time:        {best * 1000:.1f} ms')
+    print(f'throughput:       {lines / best:.0f} rows/s')
+    print(f'peak memory:      {peak / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
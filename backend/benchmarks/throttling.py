@@ -0,0 +1,100 @@
+"""Накладные расходы ограничения частоты запросов.
+
+Запуск: python -m benchmarks.throttling --requests 20000 --clients 100
+
+Замеряет проверку TokenBucketThrottle на запрос с кэшем из CACHE_URL:
+пропущенные запросы (incr и get в общем кэше) и отклонённые с расчётом
+Retry-After (из памяти процесса). Для Redis или Memcached время
+включает сетевой обмен с ними. Кэш в памяти процесса хранит не больше
+300 записей, поэтому при большем --clients счётчики вытесняются.
+"""
+import argparse
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from foodgram.throttling import TokenBucketThrottle, blocked
+
+BUDGET_US = 100
+
+
+class View:
+    """Действие вьюсета с классом search"""
+    action = 'list'
+    throttle_scopes = {'list': 'search'}
+
+
+def search_rate(rate):
+    """Настройки с частотой rate для класса search"""
+    return override_settings(
+        THROTTLE_ENABLED=True,
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                        'DEFAULT_THROTTLE_RATES': {'search': rate}}
+    )
+
+
+def measure(requests, view):
+    timings = []
+    rejected = 0
+    for request in requests:
+        throttle = TokenBucketThrottle()
+        started = time.perf_counter()
+        if not throttle.allow_request(request, view):
+            throttle.wait()
+            rejected += 1
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings, rejected
+
+
+def report(name, timings, rejected):
+    timings.sort()
+    print(f'{name}:')
+    print(f'  requests:  {len(timings)} (rejected {rejected})')
+    print(f'  mean:      {statistics.mean(timings):.1f} us')
+    print(f'  p50:       {timings[len(timings) // 2]:.1f} us')
+    print(f'  p99:       {timings[int(len(timings) * 0.99)]:.1f} us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=100)
+    args = parser.parse_args()
+
+    factory = APIRequestFactory()
+    clients = [
+        Request(factory.get(
+            '/api/ingredients/',
+            REMOTE_ADDR=f'10.0.{number // 256}.{number % 256}'
+        ))
+        for number in range(args.clients)
+    ]
+    requests = [clients[number % args.clients]
+                for number in range(args.requests)]
+    cache.clear()
+    with search_rate(f'{10 ** 9}/min'):
+        allowed = measure(requests, View)
+    cache.clear()
+    with search_rate('1/min'):
+        # Каждый клиент тратит единственный токен
+        measure(clients, View)
+        throttled = measure(requests, View)
+    cache.clear()
+    blocked.clear()
+
+    backend = type(caches['default']).__name__
+    print(f'cache backend:  {backend}')
+    report('allowed', *allowed)
+    report('throttled', *throttled)
+    worst = max(statistics.mean(allowed[0]), statistics.mean(throttled[0]))
+    verdict = 'ok' if worst < BUDGET_US else 'exceeded'
+    print(f'budget {BUDGET_US} us: {verdict}')
+
+
+if __name__ == '__main__':
+    main()
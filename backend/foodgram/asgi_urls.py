@@ -0,0 +1,16 @@
+"""Адреса для ASGI: горячие GET-запросы обслуживают асинхронные
+представления, остальное - те же синхронные, что и под WSGI"""
+from django.urls import path
+
+from recipes import async_views as recipes
+from users import async_views as users
+from . import urls
+
+urlpatterns = [
+    path('api/recipes/', recipes.recipe_list),
+    path('api/recipes/<int:pk>/', recipes.recipe_detail),
+    path('api/tags/', recipes.tag_list),
+    path('api/ingredients/', recipes.ingredient_list),
+    path('api/users/subscriptions/', users.subscriptions),
+    *urls.urlpatterns,
+]
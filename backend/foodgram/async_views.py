@@ -0,0 +1,139 @@
+"""Асинхронные представления для чтения под ASGI.
+
+Синхронные представления Django под ASGI выполняет в одном общем
+потоке, поэтому медленные запросы к БД одного клиента задерживают
+остальных. Асинхронное представление отдаёт каждый запрос к БД в пул
+потоков (в Django 4.0 нет асинхронного ORM), а независимые запросы
+одной страницы - строки, число строк, превью - выполняет одновременно.
+
+Аутентификация, права, троттлинг, согласование формата и обработка
+ошибок берутся у вьюсета, поэтому ответы совпадают с синхронными.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import close_old_connections
+from django.urls import resolve
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+
+from .routers import request_routing
+
+SYNC_URLCONF = 'foodgram.urls'
+
+
+def database_call(func):
+    """Закрывает устаревшие соединения потока пула перед вызовом"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def in_thread(func):
+    """Синхронная функция как корутина.
+
+    При ASYNC_DB_CONCURRENCY вызовы выполняются в пуле потоков, каждый
+    со своим соединением с БД; иначе - по очереди в общем потоке, как
+    синхронные представления (так видны данные транзакции TestCase).
+    """
+    if settings.ASYNC_DB_CONCURRENCY:
+        return sync_to_async(database_call(func), thread_sensitive=False)
+    return sync_to_async(func)
+
+
+async def gather(*functions):
+    """Одновременно вызывает функции без аргументов, результаты
+    возвращает в том же порядке"""
+    return await asyncio.gather(*(in_thread(func)() for func in functions))
+
+
+async def sync_view(request):
+    """Обрабатывает запрос синхронным представлением того же адреса"""
+    match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+    return await sync_to_async(match.func)(
+        request, *match.args, **match.kwargs)
+
+
+def async_read(viewset, action, read=None):
+    """Асинхронное представление GET-запросов к действию вьюсета.
+
+    read(view, request, *args, **kwargs) - корутина, возвращающая Response
+    или None, если запрос должен обработать сам вьюсет. Без read, для
+    запросов не в JSON и с другими методами действие вьюсета выполняется
+    целиком в потоке.
+    """
+    method = getattr(viewset, action)
+    initkwargs = {'basename': None, 'detail': None,
+                  **getattr(method, 'kwargs', {})}
+
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_view(request)
+        self = viewset(**initkwargs)
+        self.action_map = {'get': action, 'head': action}
+        self.args = args
+        self.kwargs = kwargs
+        with request_routing():
+            request = self.initialize_request(request, *args, **kwargs)
+            self.request = request
+            self.headers = self.default_response_headers
+            try:
+                await in_thread(self.initial)(request, *args, **kwargs)
+                response = None
+                if read is not None and isinstance(request.accepted_renderer,
+                                                   JSONRenderer):
+                    response = await read(self, request, *args, **kwargs)
+                if response is None:
+                    response = await in_thread(getattr(self, action))(
+                        request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+            return self.finalize_response(request, response, *args,
+                                          **kwargs)
+
+    # Атрибуты as_view: по ним считаются бюджеты запросов
+    view.cls = viewset
+    view.actions = {'get': action}
+    view.csrf_exempt = True
+    return view
+
+
+async def paginate(view, request, queryset, serialize):
+    """Страница queryset: число строк и строки страницы запрашиваются
+    одновременно, затем корутина serialize(rows) возвращает данные.
+
+    Курсор, page=last и нечисловые номера страниц обрабатывает вьюсет.
+    """
+    paginator = view.paginator
+    params = request.query_params
+    if paginator.cursor_query_param in params:
+        return None
+    page_size = paginator.get_page_size(request)
+    try:
+        number = int(params.get(paginator.page_query_param, 1))
+    except ValueError:
+        return None
+    if number < 1:
+        return None
+    offset = (number - 1) * page_size
+    count, rows = await gather(
+        queryset.count, lambda: list(queryset[offset:offset + page_size])
+    )
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = count
+    try:
+        django_paginator.validate_number(number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(
+            page_number=number, message=str(exc)
+        ))
+    paginator.page = django_paginator._get_page(rows, number,
+                                                django_paginator)
+    paginator.request = request
+    data = await serialize(rows)
+    return paginator.get_paginated_response(data)
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('foodgram.requests')
+_current = ContextVar('request_stats', default=None)
+_serializing = ContextVar('serializing', default=False)
+
+IN_LIST = re.compile(r'\((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Текст запроса без значений параметров, списки IN свёрнуты"""
+    return IN_LIST.sub('(...)', sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше запросов, чем для него заявлено"""
+
+
+class RequestStats:
+    """Счётчики запросов к БД одного HTTP-запроса.
+
+    Экземпляр подключается к соединениям через execute_wrapper, поэтому
+    работает и при DEBUG = False. Запросы могут приходить из нескольких
+    потоков одновременно.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.serialize_time = 0.0
+        self.fingerprints = Counter()
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.db_time += elapsed
+                self.queries += 1
+                self.fingerprints[fingerprint(sql)] += 1
+
+    @contextmanager
+    def serializing(self):
+        """Учитывает время блока как время сериализации; вложенные
+        блоки не считаются повторно"""
+        if _serializing.get():
+            yield
+            return
+        token = _serializing.set(True)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _serializing.reset(token)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.serialize_time += elapsed
+
+    @property
+    def duplicates(self):
+        return {
+            sql: count for sql, count in self.fingerprints.items()
+            if count > 1
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """Передаёт запрос в RequestStats текущего HTTP-запроса.
+
+    Статистика берётся из контекстной переменной, поэтому учитываются
+    и запросы из потоков sync_to_async асинхронных представлений.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def serialization():
+    """Замер сериализации для RequestStats текущего HTTP-запроса,
+    например вокруг serializer.data; вне запроса ничего не делает"""
+    stats = _current.get()
+    if stats is None:
+        return nullcontext()
+    return stats.serializing()
+
+
+def install_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_query_budget(view_func, method):
+    """Бюджет запросов действия вьюсета из атрибута query_budgets"""
+    view_class = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower())
+    budgets = getattr(view_class, 'query_budgets', None) or {}
+    if action not in budgets:
+        return None, None
+    return f'{view_class.__name__}.{action}', budgets[action]
+
+
+class RequestStatsMiddleware:
+    """Считает запросы к БД, время БД, сериализации и рендеринга ответа.
+
+    Работает и в синхронном, и в асинхронном стеке middleware. Время
+    сериализации набирается в блоках serialization() и включает запросы
+    к БД из сериализаторов.
+
+    Итоги уходят в заголовок Server-Timing и в журнал foodgram.requests
+    одной JSON-строкой; повторяющиеся запросы пишутся с уровнем WARNING.
+    Если действие вьюсета превысило свой бюджет запросов, это
+    записывается в журнал, а при QUERY_BUDGETS_ENFORCE - приводит
+    к исключению QueryBudgetExceeded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(
+            install_recorder, dispatch_uid='foodgram.install_recorder'
+        )
+        for connection in connections.all():
+            install_recorder(connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response)
+
+    @staticmethod
+    def start(request):
+        request.stats = RequestStats()
+        request.query_budget = (None, None)
+        return _current.set(request.stats)
+
+    def finish(self, request, response):
+        stats = request.stats
+        total = time.perf_counter() - stats.started
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = self.server_timing(stats, total)
+        self.log(request, response, stats, total)
+        self.check_budget(request, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.stats.render_time += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def server_timing(stats, total):
+        return ', '.join((
+            f'db;dur={stats.db_time * 1000:.1f};'
+            f'desc="{stats.queries} queries"',
+            f'serialize;dur={stats.serialize_time * 1000:.1f}',
+            f'render;dur={stats.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    @staticmethod
+    def log(request, response, stats, total):
+        duplicates = stats.duplicates
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': request.query_budget[0],
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 1),
+            'serialize_ms': round(stats.serialize_time * 1000, 1),
+            'render_ms': round(stats.render_time * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'duplicates': [
+                {'sql': sql, 'count': count}
+                for sql, count in duplicates.items()
+            ],
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False),
+                   extra={'stats': record})
+
+    @staticmethod
+    def check_budget(request, stats):
+        view, budget = request.query_budget
+        if budget is None or stats.queries <= budget:
+            return
+        message = (f'{view}: {stats.queries} queries, '
+                   f'budget is {budget}')
+        if settings.QUERY_BUDGETS_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
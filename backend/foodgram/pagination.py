@@ -1,6 +1,156 @@
+import base64
+import json
+import math
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPageNumberPaginator(PageNumberPagination):
+    """Постраничная пагинация с ключевым режимом ?cursor=.
+
+    В ключевом режиме следующая страница выбирается условием по полям
+    сортировки последней строки, а не через OFFSET, а вместо COUNT(*)
+    возвращается оценка числа строк из статистики PostgreSQL.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    keyset = False
+    # Поля сортировки числовые, в курсоре ничего другого быть не может
+    max_cursor_value = 2 ** 63
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params
+                or not isinstance(queryset, QuerySet)):
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.count = self.get_approximate_count(queryset)
+        fields = self.get_keyset_fields(queryset)
+        queryset = queryset.order_by(
+            *(f'-{name}' if desc else name for name, desc in fields)
+        )
+        position = self.decode_cursor(request, len(fields))
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(fields, position))
+        rows = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = [
+                getattr(rows[-1], name) for name, _ in fields
+            ]
+        return rows
+
+    def paginate_keys(self, fetch, request):
+        """Ключевая пагинация по убывающему целому ключу.
+
+        fetch(before, limit) возвращает не больше limit ключей меньше
+        before по убыванию, при before=None - с начала.
+        """
+        self.keyset = True
+        self.request = request
+        self.count = None
+        page_size = self.get_page_size(request)
+        before = None
+        if request.query_params.get(self.cursor_query_param):
+            before, = self.decode_cursor(request, 1)
+            if not isinstance(before, int):
+                raise NotFound(self.invalid_cursor_message)
+        keys = fetch(before, page_size + 1)
+        self.next_position = None
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            self.next_position = [keys[-1]]
+        return keys
+
+    @staticmethod
+    def get_approximate_count(queryset):
+        """Оценка числа строк таблицы для запросов без фильтров"""
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+    @staticmethod
+    def get_keyset_fields(queryset):
+        """Поля сортировки в виде (имя, по убыванию), последним идёт id"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        fields = [(field.lstrip('-'), field.startswith('-'))
+                  for field in ordering]
+        if not fields or fields[-1][0] not in ('id', 'pk'):
+            fields.append(('id', True))
+        return fields
+
+    @staticmethod
+    def keyset_filter(fields, position):
+        conditions = []
+        for index, (name, desc) in enumerate(fields):
+            equal = {
+                field: value for (field, _), value
+                in zip(fields[:index], position)
+            }
+            lookup = 'lt' if desc else 'gt'
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': position[index]})
+            )
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request, length):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list) or len(position) != length
+                or not all(map(self.is_position_value, position))):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def is_position_value(self, value):
+        """Конечное число в пределах bigint"""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return math.isfinite(value) and abs(value) < self.max_cursor_value
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(self.next_position).encode()
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            cursor
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'results': data,
+        })
@@ -0,0 +1,189 @@
+import asyncio
+import random
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_route = ContextVar('db_route', default=None)
+_unhealthy = {}
+_checked = weakref.WeakKeyDictionary()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES
+            if alias != DEFAULT_DB_ALIAS]
+
+
+STICKY_COOKIE = 'db_primary'
+STICKY_SALT = 'foodgram.routers.sticky'
+
+
+def mark_sticky(response, user):
+    """Направляет чтение пользователя в основную базу на время
+    DB_REPLICA_STICKY_SECONDS, чтобы он видел свои изменения.
+
+    Метка хранится в подписанной cookie, а не в кэше, поэтому её видит
+    любой воркер, к которому придёт следующий запрос.
+    """
+    response.set_signed_cookie(
+        STICKY_COOKIE, user.pk, salt=STICKY_SALT,
+        max_age=settings.DB_REPLICA_STICKY_SECONDS,
+        httponly=True, samesite='Lax'
+    )
+
+
+def is_sticky(request):
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    # Подпись с отметкой времени не даёт продлить метку вручную
+    value = request.get_signed_cookie(
+        STICKY_COOKIE, default=None, salt=STICKY_SALT,
+        max_age=settings.DB_REPLICA_STICKY_SECONDS
+    )
+    return value == str(user.pk)
+
+
+def pick_replica():
+    """Случайная доступная реплика или None.
+
+    Реплика, к которой не удалось подключиться, исключается на
+    DB_REPLICA_RETRY_SECONDS.
+    """
+    now = time.monotonic()
+    candidates = [alias for alias in replica_aliases()
+                  if _unhealthy.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            _unhealthy[alias] = now + settings.DB_REPLICA_RETRY_SECONDS
+            continue
+        return alias
+    return None
+
+
+def read_database(request):
+    """Реплика для чтения запроса или None, если реплик нет или
+    пользователь недавно что-то менял"""
+    if replica_aliases() and not is_sticky(request):
+        return pick_replica()
+    return None
+
+
+def route_reads(alias):
+    _route.set(alias)
+
+
+@contextmanager
+def request_routing():
+    """Ограничивает выбор базы для чтения одним запросом"""
+    token = _route.set(None)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def check_connections(**kwargs):
+    """Закрывает постоянные соединения, переставшие отвечать.
+
+    Проверка выполняется в начале запроса, не чаще раза
+    в DB_HEALTH_CHECK_INTERVAL секунд для каждого соединения.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked = _checked.setdefault(connection, now)
+        if now - checked < settings.DB_HEALTH_CHECK_INTERVAL:
+            continue
+        _checked[connection] = now
+        if not connection.is_usable():
+            connection.close()
+
+
+request_started.connect(check_connections,
+                        dispatch_uid='foodgram.routers.check_connections')
+
+
+class ReplicaRouter:
+    """Отправляет чтение в реплику, выбранную для текущего запроса.
+
+    Запись, миграции и чтение внутри транзакций идут в основную базу.
+    """
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return _route.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """Выполняет безопасные действия из replica_actions на реплике,
+    если пользователь недавно ничего не менял"""
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        with request_routing():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS
+                and self.action in self.replica_actions):
+            route_reads(read_database(request))
+
+
+class PrimaryAfterWriteMiddleware:
+    """Закрепляет пользователя за основной базой после успешной записи"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            self.mark_user(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            # request.user может лениво читать сессию из БД
+            await sync_to_async(self.mark_user)(request, response)
+        return response
+
+    @staticmethod
+    def is_write(request, response):
+        return (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and bool(replica_aliases()))
+
+    @staticmethod
+    def mark_user(request, response):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_sticky(response, user)
@@ -13,12 +13,46 @@ env = environ.Env(
     POSTGRES_PASSWORD=str,
     DB_HOST=str,
     DB_PORT=int,
+    DB_CONN_MAX_AGE=(int, 60),
+    DB_REPLICA_URLS=(list, []),
+    DB_REPLICA_STICKY_SECONDS=(int, 5),
+    DB_REPLICA_RETRY_SECONDS=(int, 30),
+    DB_HEALTH_CHECK_INTERVAL=(int, 30),
+    DEBUG=(bool, False),
+    INGREDIENT_SEARCH_IN_MEMORY=(bool, True),
+    RECIPE_MATCH_INDEX_MAX_AGE=(int, 60),
+    RECIPE_FRAGMENT_CACHE_TTL=(int, 3600),
+    CACHE_URL=(str, 'locmemcache://'),
+    LOCAL_CACHE_VERSION_TTL=(int, 30),
+    REFERENCE_CACHE_TTL=(int, 86400),
+    REQUEST_STATS_ENABLED=(bool, True),
+    SERVER_TIMING_ENABLED=(bool, True),
+    QUERY_BUDGETS_ENFORCE=(bool, False),
+    LOG_LEVEL=(str, 'INFO'),
+    ROOT_URLCONF=(str, 'foodgram.urls'),
+    ASYNC_DB_CONCURRENCY=(bool, True),
+    AUTH_TOKEN_CACHE_SIZE=(int, 10000),
+    AUTH_TOKEN_CACHE_TTL=(int, 300),
+    FEED_FANOUT_LIMIT=(int, 10000),
+    FEED_BATCH_SIZE=(int, 1000),
+    FEED_BACKFILL_SIZE=(int, 100),
+    TASK_MAX_ATTEMPTS=(int, 3),
+    TASK_RETRY_DELAY=(int, 10),
+    TASK_LEASE_SECONDS=(int, 600),
+    TASK_POLL_INTERVAL=(float, 1.0),
+    TASK_WORKER_PROCESSES=(int, 1),
+    TASK_WORKER_THREADS=(int, 2),
+    SHOPPING_LIST_EXPORT_TTL=(int, 3600),
+    THROTTLE_ENABLED=(bool, True),
+    THROTTLE_SEARCH_RATE=(str, '120/min'),
+    THROTTLE_WRITE_RATE=(str, '60/min'),
+    THROTTLE_EXPORT_RATE=(str, '10/min'),
 )
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 environ.Env.read_env()
 SECRET_KEY = env('SECRET_KEY')
-DEBUG = True
+DEBUG = env('DEBUG')
 ALLOWED_HOSTS = env('ALLOWED_HOSTS')
 
 
@@ -37,9 +71,12 @@ INSTALLED_APPS = [
 
     'recipes',
     'users',
+    'tasks',
 ]
 
 MIDDLEWARE = [
+    'foodgram.instrumentation.RequestStatsMiddleware',
+    'foodgram.routers.PrimaryAfterWriteMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,7 +86,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = env('ROOT_URLCONF')
 
 TEMPLATES = [
     {
@@ -78,9 +115,57 @@ DATABASES = {
         'PASSWORD': env('POSTGRES_PASSWORD', default='postgres'),
         'HOST': env('DB_HOST', default='db'),
         'PORT': env('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': env('DB_CONN_MAX_AGE'),
     }
 }
 
+for number, url in enumerate(env('DB_REPLICA_URLS'), start=1):
+    DATABASES[f'replica{number}'] = {
+        **env.db_url_config(url),
+        'CONN_MAX_AGE': env('DB_CONN_MAX_AGE'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = env('DB_REPLICA_STICKY_SECONDS')
+DB_REPLICA_RETRY_SECONDS = env('DB_REPLICA_RETRY_SECONDS')
+DB_HEALTH_CHECK_INTERVAL = env('DB_HEALTH_CHECK_INTERVAL')
+# Асинхронные представления выполняют запросы к БД в пуле потоков
+ASYNC_DB_CONCURRENCY = env('ASYNC_DB_CONCURRENCY')
+
+CACHES = {
+    'default': env.cache('CACHE_URL'),
+}
+# Время жизни версий кэшированных данных, если кэш в памяти процесса:
+# изменения из других процессов видны с такой задержкой
+LOCAL_CACHE_VERSION_TTL = env('LOCAL_CACHE_VERSION_TTL')
+# Время жизни закэшированных справочников: после смены версии прежний
+# список остаётся в кэше не дольше этого
+REFERENCE_CACHE_TTL = env('REFERENCE_CACHE_TTL')
+
+REQUEST_STATS_ENABLED = env('REQUEST_STATS_ENABLED')
+SERVER_TIMING_ENABLED = env('SERVER_TIMING_ENABLED')
+QUERY_BUDGETS_ENFORCE = env('QUERY_BUDGETS_ENFORCE')
+
+TEST_RUNNER = 'foodgram.testing.QueryBudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': env('LOG_LEVEL'),
+            'propagate': False,
+        },
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,12 +202,56 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+INGREDIENT_SEARCH_IN_MEMORY = env('INGREDIENT_SEARCH_IN_MEMORY')
+
+RECIPE_MATCH_INDEX_MAX_AGE = env('RECIPE_MATCH_INDEX_MAX_AGE')
+
+# Время жизни кэшированных представлений рецептов в секундах
+RECIPE_FRAGMENT_CACHE_TTL = env('RECIPE_FRAGMENT_CACHE_TTL')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-    )
+        'users.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'foodgram.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'search': env('THROTTLE_SEARCH_RATE'),
+        'write': env('THROTTLE_WRITE_RATE'),
+        'export': env('THROTTLE_EXPORT_RATE'),
+    },
 }
 
+# Ограничение частоты запросов классов search, write и export, состояние
+# в общем кэше (CACHE_URL)
+THROTTLE_ENABLED = env('THROTTLE_ENABLED')
+
+# Снимки пользователей по токенам: записей в памяти процесса и время
+# жизни записи в секундах
+AUTH_TOKEN_CACHE_SIZE = env('AUTH_TOKEN_CACHE_SIZE')
+AUTH_TOKEN_CACHE_TTL = env('AUTH_TOKEN_CACHE_TTL')
+
+# Лента подписок: рецепты авторов, у которых подписчиков больше
+# FEED_FANOUT_LIMIT, не раскладываются по лентам, а подмешиваются при
+# чтении; размер пачки вставки и число рецептов, добавляемых при подписке
+FEED_FANOUT_LIMIT = env('FEED_FANOUT_LIMIT')
+FEED_BATCH_SIZE = env('FEED_BATCH_SIZE')
+FEED_BACKFILL_SIZE = env('FEED_BACKFILL_SIZE')
+
+# Очередь фоновых задач: попыток на задачу, начальная задержка повтора и
+# время, после которого выполняемая задача считается брошенной, в
+# секундах; воркеры manage.py run_workers по умолчанию
+TASK_MAX_ATTEMPTS = env('TASK_MAX_ATTEMPTS')
+TASK_RETRY_DELAY = env('TASK_RETRY_DELAY')
+TASK_LEASE_SECONDS = env('TASK_LEASE_SECONDS')
+TASK_POLL_INTERVAL = env('TASK_POLL_INTERVAL')
+TASK_WORKER_PROCESSES = env('TASK_WORKER_PROCESSES')
+TASK_WORKER_THREADS = env('TASK_WORKER_THREADS')
+
+# Время жизни файлов выгрузки списка покупок в секундах
+SHOPPING_LIST_EXPORT_TTL = env('SHOPPING_LIST_EXPORT_TTL')
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'users.serializers.CustomUserSerializer',
@@ -0,0 +1,33 @@
+import logging
+
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .instrumentation import install_recorder
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Запускает тесты с обязательным соблюдением бюджетов запросов,
+    без ограничения частоты запросов и без построчного журнала запросов
+    в выводе"""
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.budgets = override_settings(QUERY_BUDGETS_ENFORCE=True,
+                                         THROTTLE_ENABLED=False)
+        self.budgets.enable()
+        self.log_level = logging.getLogger('foodgram.requests').level
+        logging.getLogger('foodgram.requests').setLevel(logging.ERROR)
+
+    def setup_databases(self, **kwargs):
+        config = super().setup_databases(**kwargs)
+        # Соединение тестовой базы открыто до первого запроса, а запросы
+        # асинхронных представлений приходят в него из других потоков
+        for connection in connections.all():
+            install_recorder(connection)
+        return config
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('foodgram.requests').setLevel(self.log_level)
+        self.budgets.disable()
+        super().teardown_test_environment(**kwargs)
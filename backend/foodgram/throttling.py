@@ -0,0 +1,128 @@
+"""Ограничение частоты запросов по классам действий.
+
+Действие вьюсета попадает в класс (search, write, export) через атрибут
+throttle_scopes {действие: класс}, действия без класса не ограничиваются.
+Частота класса задаётся в DEFAULT_THROTTLE_RATES в формате DRF, например
+'60/min': клиент может сразу потратить 60 запросов, а затем получает по
+одному каждую секунду, как из ведра с токенами.
+
+Ведро хранится в общем кэше Django двумя счётчиками: запросы текущего и
+предыдущего окна длиной в период. Уровень ведра - счётчик текущего окна
+плюс доля предыдущего, ещё не вышедшая из скользящего окна. Счётчик
+увеличивается атомарным incr до проверки, поэтому параллельные запросы
+разных воркеров не превышают ёмкость; отклонённый запрос возвращает
+токен. Отклонённый клиент до Retry-After отклоняется из памяти процесса
+без обращений к кэшу.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+BLOCKED_CACHE_SIZE = 10000
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'60/min' -> (60, 60): ёмкость ведра и период в секундах"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class Blocked:
+    """Клиенты, которым уже отказано, со временем окончания отказа по
+    time.monotonic(); не больше BLOCKED_CACHE_SIZE записей"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def wait(self, key):
+        """Сколько секунд клиенту осталось ждать; None, если не нужно"""
+        until = self._entries.get(key)
+        if until is None:
+            return None
+        wait = until - time.monotonic()
+        if wait > 0:
+            return wait
+        with self._lock:
+            self._entries.pop(key, None)
+        return None
+
+    def add(self, key, wait):
+        with self._lock:
+            self._entries[key] = time.monotonic() + wait
+            self._entries.move_to_end(key)
+            while len(self._entries) > BLOCKED_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+blocked = Blocked()
+
+
+def take_token(key, capacity, period):
+    """Забирает токен из ведра key; возвращает 0, если он был, иначе
+    сколько секунд ждать следующего"""
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    current = f'throttle:{key}:{int(window)}'
+    try:
+        used = cache.incr(current)
+    except ValueError:
+        # Окно предыдущего периода нужно и в следующем
+        if cache.add(current, 1, 2 * period):
+            used = 1
+        else:
+            used = cache.incr(current)
+    previous = cache.get(f'throttle:{key}:{int(window) - 1}', 0)
+    level = used + previous * (period - elapsed) / period
+    if level <= capacity:
+        return 0
+    try:
+        cache.decr(current)
+    except ValueError:
+        pass
+    # Ведро наполняется со скоростью capacity токенов за период
+    return (level - capacity) * period / capacity
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ведро токенов на пользователя (анонима - по IP) и класс действия"""
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', None) or {}
+        return scopes.get(getattr(view, 'action', None))
+
+    def allow_request(self, request, view):
+        self.delay = None
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        user = request.user
+        if user and user.is_authenticated:
+            ident = f'user:{user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        key = f'{scope}:{ident}'
+        self.delay = blocked.wait(key)
+        if self.delay is not None:
+            return False
+        self.delay = take_token(key, *parse_rate(rate))
+        if self.delay:
+            blocked.add(key, self.delay)
+            return False
+        return True
+
+    def wait(self):
+        return self.delay
@@ -6,6 +6,7 @@ from django.urls.conf import include
 api = [
     path('', include('users.urls', namespace='users')),
     path('', include('recipes.urls', namespace='recipes')),
+    path('', include('tasks.urls', namespace='tasks')),
 ]
 
 urlpatterns = [
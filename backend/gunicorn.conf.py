@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# Воркеры uvicorn обслуживают foodgram.asgi:application; для WSGI
+# укажите GUNICORN_WORKER_CLASS=gthread и приложение foodgram.wsgi.
+#
+# Синхронный поток держит своё постоянное соединение с каждой базой
+# (CONN_MAX_AGE). Под ASGI соединения открывают общий поток синхронных
+# представлений и потоки пула асинхронных (до min(32, cpu + 4)), под
+# WSGI - каждый из workers * threads потоков.
+bind = os.environ.get('GUNICORN_BIND', '0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS',
+                              'uvicorn.workers.UvicornWorker')
+workers = int(os.environ.get('GUNICORN_WORKERS',
+                             multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def on_starting(server):
+    """Не запускает несколько воркеров с кэшем в памяти процесса: через
+    общий кэш воркеры делят ограничение частоты запросов, сброс токенов
+    и версии закэшированных данных"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        raise RuntimeError(
+            f'{workers} workers need a shared cache, set CACHE_URL '
+            f'(for example redis://redis:6379/0) instead of {backend}'
+        )
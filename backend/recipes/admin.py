@@ -23,8 +23,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'count_favorites')
     list_filter = ('author', 'name', 'tags')
 
+    @admin.display(description='В избранном',
+                   ordering='favorites_count')
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(RecipeIngredient)
@@ -0,0 +1,58 @@
+from django.db.models.query import prefetch_related_objects
+from django.http import Http404
+from rest_framework.response import Response
+
+from foodgram.async_views import async_read, gather, in_thread, paginate
+from .fragments import RELATIONS, RecipeFragments
+from .models import Recipe
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def recipe_queryset(view):
+    """Рецепты с флагами пользователя и автором, без prefetch"""
+    return view.filter_queryset(
+        Recipe.objects.with_user_flags(view.request.user)
+        .select_related('author')
+    )
+
+
+async def render(view, request, recipes):
+    """Данные рецептов из кэша фрагментов; теги и ингредиенты промахов
+    запрашиваются одновременно"""
+    fragments = await in_thread(RecipeFragments)(recipes, request)
+    missing = fragments.missing
+    if missing:
+        for recipe in missing:
+            recipe._prefetched_objects_cache = {}
+        await gather(*(
+            lambda relation=relation: prefetch_related_objects(
+                missing, relation)
+            for relation in RELATIONS
+        ))
+    return await in_thread(fragments.render)(view.get_serializer_context())
+
+
+async def list_recipes(view, request):
+    """Страница рецептов: строки и число строк одновременно, затем
+    фрагменты рецептов страницы"""
+    queryset = await in_thread(recipe_queryset)(view)
+    return await paginate(
+        view, request, queryset,
+        lambda recipes: render(view, request, recipes)
+    )
+
+
+async def retrieve_recipe(view, request, pk):
+    queryset = await in_thread(recipe_queryset)(view)
+    recipe = await in_thread(lambda: queryset.filter(pk=pk).first())()
+    if recipe is None:
+        raise Http404
+    view.check_object_permissions(request, recipe)
+    return Response((await render(view, request, [recipe]))[0])
+
+
+recipe_list = async_read(RecipeViewSet, 'list', list_recipes)
+recipe_detail = async_read(RecipeViewSet, 'retrieve', retrieve_recipe)
+# Справочники отдаются из кэша, поиск ингредиентов - из индекса в памяти
+tag_list = async_read(TagViewSet, 'list')
+ingredient_list = async_read(IngredientViewSet, 'list')
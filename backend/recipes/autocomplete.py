@@ -0,0 +1,56 @@
+import threading
+from bisect import bisect_left
+
+from .cache import get_version
+from .models import Ingredient
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """Префиксный индекс названий ингредиентов в памяти процесса.
+
+    Строится лениво при первом поиске и перестраивается, когда меняется
+    версия справочника ингредиентов в кэше.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = None
+        self._items = None
+
+    def _load(self):
+        version = get_version('ingredients')
+        with self._lock:
+            if self._version != version:
+                entries = sorted(
+                    (normalize(name), name, pk, measurement_unit)
+                    for pk, name, measurement_unit in
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit')
+                )
+                self._items = [
+                    {'id': pk, 'name': name,
+                     'measurement_unit': measurement_unit}
+                    for _, name, pk, measurement_unit in entries
+                ]
+                self._keys = [key for key, *_ in entries]
+                self._version = version
+            return self._keys, self._items
+
+    def search(self, query):
+        """Сначала совпадения по началу названия, затем по подстроке"""
+        keys, items = self._load()
+        query = normalize(query)
+        start = end = bisect_left(keys, query)
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        return items[start:end] + [
+            item for key, item in zip(keys, items)
+            if query in key and not key.startswith(query)
+        ]
+
+
+ingredient_index = IngredientIndex()
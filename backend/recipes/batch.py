@@ -0,0 +1,42 @@
+from django.db.models import Exists, OuterRef
+
+from .counters import refresh_counters
+
+CREATED = 'created'
+EXISTS = 'exists'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+
+def add_batch(model, field, user, targets, ids, errors=None):
+    """Связывает пользователя с объектами targets с id из ids строками
+    model, где field - внешний ключ на объект.
+
+    Одним запросом проверяет id и уже существующие связи, одним
+    bulk_create вставляет недостающие и пересчитывает счётчики. errors -
+    словарь {id: сообщение} для id, которые добавлять нельзя. Возвращает
+    id созданных связей и результат по каждому id.
+    """
+    errors = errors or {}
+    linked = dict(targets.filter(pk__in=ids).order_by().annotate(
+        linked=Exists(model.objects.filter(
+            user=user, **{field: OuterRef('pk')}))
+    ).values_list('pk', 'linked'))
+    created = [pk for pk in ids
+               if linked.get(pk) is False and pk not in errors]
+    model.objects.bulk_create(
+        (model(user=user, **{f'{field}_id': pk}) for pk in created),
+        ignore_conflicts=True
+    )
+    if created:
+        refresh_counters(model, created)
+    results = []
+    for pk in ids:
+        if pk not in linked:
+            results.append({'id': pk, 'status': NOT_FOUND})
+        elif pk in errors:
+            results.append({'id': pk, 'status': ERROR, 'errors': errors[pk]})
+        else:
+            results.append(
+                {'id': pk, 'status': EXISTS if linked[pk] else CREATED})
+    return created, results
@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def is_process_local():
+    """Кэш по умолчанию хранится в памяти процесса, и другие воркеры
+    его изменений не видят"""
+    return isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def version_key(namespace):
+    return f'reference:{namespace}:version'
+
+
+def version_timeout():
+    """Время жизни версии: в общем кэше - бессрочно, в кэше процесса -
+    LOCAL_CACHE_VERSION_TTL секунд, чтобы изменения из других процессов
+    становились видны хотя бы с такой задержкой"""
+    return settings.LOCAL_CACHE_VERSION_TTL if is_process_local() else None
+
+
+def get_version(namespace):
+    """Возвращает время последнего изменения справочника"""
+    return cache.get_or_set(version_key(namespace), time.time,
+                            timeout=version_timeout())
+
+
+def bump_version(namespace):
+    cache.set(version_key(namespace), time.time(), timeout=version_timeout())
+
+
+def content_key(namespace, version):
+    return f'reference:{namespace}:{version!r}'
+
+
+def recipe_namespace(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def author_namespace(author_id):
+    return f'author:{author_id}'
+
+
+def bump_fragments(recipe_ids=(), author_ids=()):
+    """Меняет версии рецептов и авторов после фиксации транзакции"""
+    keys = [version_key(recipe_namespace(pk)) for pk in recipe_ids]
+    keys += [version_key(author_namespace(pk)) for pk in author_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(
+            dict.fromkeys(keys, time.time()), timeout=version_timeout()
+        ))
@@ -0,0 +1,52 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import CustomUser, Follow
+from .models import Favorite, Recipe, ShoppingCart
+
+# Денормализованный счётчик: (модель, поле счётчика,
+# считаемая модель, внешний ключ считаемой модели на первую)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (CustomUser, 'recipes_count', Recipe, 'author'),
+    (CustomUser, 'followers_count', Follow, 'author'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик на delta, не опуская его ниже нуля"""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_subquery(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def refresh_counters(related_model, pks):
+    """Пересчитывает одним запросом счётчики строк related_model у строк
+    pks, например после bulk_create, который не вызывает сигналов"""
+    for model, field, counted_model, related_field in COUNTERS:
+        if counted_model is related_model:
+            model.objects.filter(pk__in=pks).update(
+                **{field: count_subquery(counted_model, related_field)}
+            )
+
+
+def repair_counter(model, field, related_model, related_field):
+    """Пересчитывает расходящиеся счётчики, возвращает число исправлений"""
+    actual = count_subquery(related_model, related_field)
+    drifted = model.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}
+    )
+    return model.objects.filter(
+        pk__in=drifted.values('pk')
+    ).update(**{field: actual})
@@ -0,0 +1,100 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт сразу раскладывается по лентам подписчиков автора
+(fan-out при записи), а чтение ленты - это ключевой проход по индексу
+(user, recipe). Рецепты авторов, у которых больше FEED_FANOUT_LIMIT
+подписчиков, не раскладываются: при чтении они подмешиваются к ленте
+прямым запросом по автору (fan-out при чтении).
+"""
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+
+from users.models import Follow
+from .models import FeedEntry, Recipe
+
+
+def fan_out(recipe):
+    """Добавляет рецепт в ленты подписчиков автора пачками по
+    FEED_BATCH_SIZE строк"""
+    followers = Follow.objects.filter(
+        author=recipe.author_id,
+        author__followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('user', flat=True).iterator(
+        chunk_size=settings.FEED_BATCH_SIZE)
+    for batch in iter(
+        lambda: list(islice(followers, settings.FEED_BATCH_SIZE)), []
+    ):
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, recipe_id=recipe.pk)
+             for user_id in batch),
+            ignore_conflicts=True
+        )
+
+
+def backfill(user_id, author_ids):
+    """Добавляет в ленту подписчика последние FEED_BACKFILL_SIZE
+    рецептов каждого из авторов"""
+    recipes = Recipe.objects.filter(
+        author__followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).limited_per_author(author_ids, settings.FEED_BACKFILL_SIZE)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe.pk)
+         for recipe in recipes),
+        ignore_conflicts=True
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает рецепты автора из ленты бывшего подписчика"""
+    FeedEntry.objects.filter(
+        user=user_id, recipe__in=Recipe.objects.filter(
+            author=author_id).values('id')
+    ).delete()
+
+
+def rebuild_feeds(user_ids=None):
+    """Заполняет ленты пользователей заново по подпискам, без user_ids -
+    все"""
+    if user_ids is None:
+        FeedEntry.objects.exclude(
+            user__in=Follow.objects.values('user')).delete()
+        user_ids = Follow.objects.values('user')
+    FeedEntry.objects.filter(user__in=user_ids).delete()
+    authors = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        user__in=user_ids
+    ).values_list('user', 'author').iterator():
+        authors[user_id].append(author_id)
+    for user_id, author_ids in authors.items():
+        backfill(user_id, author_ids)
+
+
+def feed_recipe_ids(user, before=None, limit=None):
+    """id рецептов ленты по убыванию, меньше before, не больше limit.
+
+    Ключевой проход по ленте и по рецептам крупных авторов, слияние
+    двух отсортированных списков без повторов.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    recipes = Recipe.objects.filter(author__in=Follow.objects.filter(
+        user=user, author__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values('author'))
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        recipes = recipes.filter(id__lt=before)
+    sources = (
+        entries.order_by('-recipe_id').values_list('recipe_id', flat=True),
+        recipes.order_by('-id').values_list('id', flat=True),
+    )
+    ids = []
+    for recipe_id in heapq.merge(*(source[:limit] for source in sources),
+                                 reverse=True):
+        if ids and ids[-1] == recipe_id:
+            continue
+        ids.append(recipe_id)
+        if len(ids) == limit:
+            break
+    return ids
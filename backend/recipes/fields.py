@@ -0,0 +1,33 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from .images import decode_image
+
+
+class RecipeImageField(serializers.ImageField):
+    """Изображение в base64, декодируемое потоково без Pillow"""
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('http'):
+            raise SkipField()
+        if not isinstance(data, str) or ';base64,' not in data:
+            self.fail('invalid_image')
+        try:
+            return decode_image(data.split(';base64,', 1)[1])
+        except ValueError:
+            self.fail('invalid_image')
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения рецепта"""
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for rendition, paths in value.items():
+            urls[rendition] = {}
+            for extension, path in paths.items():
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[rendition][extension] = url
+        return urls
@@ -1,6 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
-from .models import Ingredient, Recipe
+from .cache import content_key, get_version
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from .search import search_recipes
+
+
+def tag_ids_by_slug():
+    """Словарь slug -> id тегов, закешированный до изменения тегов"""
+    key = f"{content_key('tags', get_version('tags'))}:slugs"
+    return cache.get_or_set(
+        key, lambda: dict(Tag.objects.values_list('slug', 'id')),
+        settings.REFERENCE_CACHE_TTL
+    )
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """Фильтр по slug тегов: варианты берутся из кеша, рецепт
+    проходит, если у него есть хотя бы один из тегов"""
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', lambda: [
+            (slug, slug) for slug in tag_ids_by_slug()
+        ])
+        super().__init__(*args, **kwargs)
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        # Тег мог быть удалён после проверки вариантов
+        ids_by_slug = tag_ids_by_slug()
+        tag_ids = [ids_by_slug[slug] for slug in value
+                   if slug in ids_by_slug]
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=tag_ids
+            )
+        ))
 
 
 class IngredientSearchFilter(filters.FilterSet):
@@ -22,16 +60,57 @@ class RecipeFilter(filters.FilterSet):
         field_name='is_in_shopping_cart',
         method='shopping_cart_filter'
     )
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugFilter(field_name='tags__slug')
+
+    def filter_by_user(self, queryset, model, value):
+        """Оставляет рецепты, которые есть (или которых нет) в model
+        текущего пользователя"""
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        exists = Exists(
+            model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )
+        return queryset.filter(exists if value else ~exists)
 
     def favorite_filter(self, queryset, name, value):
-        recipes = Recipe.objects.filter(favorites__user=self.request.user)
-        return recipes
+        return self.filter_by_user(queryset, Favorite, value)
 
     def shopping_cart_filter(self, queryset, name, value):
-        recipes = Recipe.objects.filter(shopping_cart__user=self.request.user)
-        return recipes
+        return self.filter_by_user(queryset, ShoppingCart, value)
 
     class Meta:
         model = Recipe
         fields = ['author']
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию, описанию и ингредиентам,
+    результаты упорядочены по релевантности"""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query).order_by(
+            '-search_rank', '-id'
+        )
+
+
+class RecipeOrderingFilter(BaseFilterBackend):
+    """Сортирует рецепты по заранее посчитанным рейтингам"""
+    ordering_param = 'ordering'
+    orderings = {
+        'popular': ('-popularity', '-id'),
+        'trending': ('-trending', '-id'),
+        'quickest': ('cooking_time', 'id'),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.orderings.get(
+            request.query_params.get(self.ordering_param)
+        )
+        if ordering is None:
+            return queryset
+        return queryset.order_by(*ordering)
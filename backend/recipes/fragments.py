@@ -0,0 +1,101 @@
+"""Кэш представлений рецептов без полей текущего пользователя.
+
+Фрагмент рецепта хранится под ключом из версий рецепта, его автора,
+справочников тегов и ингредиентов и адреса сайта, поэтому устаревшие
+фрагменты не удаляются, а просто перестают читаться. Флаги избранного,
+корзины и подписки на автора берутся из аннотаций with_user_flags и
+подставляются в копию фрагмента при ответе.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.db.models.query import prefetch_related_objects
+
+from foodgram.instrumentation import serialization
+
+from .cache import (author_namespace, recipe_namespace, version_key,
+                    version_timeout)
+from .models import RecipeIngredient
+from .serializers import RecipeGetSerializer
+
+RELATIONS = (
+    'author',
+    'tags',
+    Prefetch(
+        'recipe_ingredient',
+        queryset=RecipeIngredient.objects.select_related('ingredient')
+    ),
+)
+
+
+class RecipeFragments:
+    """Фрагменты рецептов страницы.
+
+    При создании двумя запросами к кэшу находит версии и готовые
+    фрагменты; рецепты без фрагмента остаются в missing. render()
+    сериализует только их, сохраняет фрагменты и возвращает данные
+    ответа в порядке recipes.
+    """
+    def __init__(self, recipes, request):
+        self.recipes = recipes
+        self.site = request.build_absolute_uri('/')
+        namespaces = {'tags', 'ingredients'}
+        for recipe in recipes:
+            namespaces.add(recipe_namespace(recipe.pk))
+            namespaces.add(author_namespace(recipe.author_id))
+        versions = cache.get_many([version_key(name) for name in namespaces])
+        missing = {version_key(name): time.time() for name in namespaces
+                   if version_key(name) not in versions}
+        if missing:
+            cache.set_many(missing, timeout=version_timeout())
+            versions.update(missing)
+        self.keys = {
+            recipe.pk: self.fragment_key(recipe, versions)
+            for recipe in recipes
+        }
+        self.fragments = cache.get_many(list(self.keys.values()))
+        self.missing = [recipe for recipe in recipes
+                        if self.keys[recipe.pk] not in self.fragments]
+
+    def fragment_key(self, recipe, versions):
+        parts = [versions[version_key(name)] for name in (
+            recipe_namespace(recipe.pk), author_namespace(recipe.author_id),
+            'tags', 'ingredients'
+        )]
+        return ':'.join(
+            ['fragment', 'recipe', str(recipe.pk)]
+            + [repr(part) for part in parts] + [self.site]
+        )
+
+    def render(self, context):
+        with serialization():
+            return self._render(context)
+
+    def _render(self, context):
+        if self.missing:
+            prefetch_related_objects(self.missing, *RELATIONS)
+            rendered = {}
+            for recipe, data in zip(self.missing, RecipeGetSerializer(
+                self.missing, many=True, context=context
+            ).data):
+                data.update(is_favorited=False, is_in_shopping_cart=False)
+                data['author']['is_subscribed'] = False
+                rendered[self.keys[recipe.pk]] = data
+            cache.set_many(rendered, settings.RECIPE_FRAGMENT_CACHE_TTL)
+            self.fragments.update(rendered)
+            self.missing = []
+        return [
+            self.personalize(self.fragments[self.keys[recipe.pk]], recipe)
+            for recipe in self.recipes
+        ]
+
+    @staticmethod
+    def personalize(fragment, recipe):
+        data = dict(fragment)
+        data.update(is_favorited=recipe.is_favorited,
+                    is_in_shopping_cart=recipe.is_in_shopping_cart)
+        data['author'] = dict(fragment['author'],
+                              is_subscribed=recipe.author_is_subscribed)
+        return data
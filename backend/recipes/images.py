@@ -0,0 +1,119 @@
+import base64
+import binascii
+import hashlib
+import logging
+import tempfile
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import bump_fragments
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+RENDITIONS = {
+    'card': (480, 320),
+    'detail': (1024, 768),
+    'preview': (160, 160),
+}
+RENDITION_FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+DECODE_CHUNK = 64 * 1024 * 4
+
+
+@dataclass
+class DecodedImage:
+    file: tempfile.SpooledTemporaryFile
+    digest: str
+    extension: str
+
+    @property
+    def name(self):
+        return f'recipes/{self.digest[:2]}/{self.digest}.{self.extension}'
+
+
+def guess_extension(header):
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    return None
+
+
+def decode_image(data):
+    """Декодирует base64 по частям во временный файл, попутно считая
+    хеш содержимого. Pillow при этом не используется"""
+    data = ''.join(data.split())
+    file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    digest = hashlib.sha256()
+    try:
+        for start in range(0, len(data), DECODE_CHUNK):
+            chunk = base64.b64decode(
+                data[start:start + DECODE_CHUNK], validate=True)
+            digest.update(chunk)
+            file.write(chunk)
+    except binascii.Error:
+        file.close()
+        raise ValueError('Некорректная строка base64')
+    file.seek(0)
+    extension = guess_extension(file.read(12))
+    if extension is None:
+        file.close()
+        raise ValueError('Неподдерживаемый формат изображения')
+    file.seek(0)
+    return DecodedImage(file, digest.hexdigest(), extension)
+
+
+def store_image(image):
+    """Сохраняет изображение под именем из хеша содержимого, одинаковые
+    загрузки хранятся в одном файле"""
+    with image.file:
+        if default_storage.exists(image.name):
+            return image.name
+        return default_storage.save(image.name, File(image.file))
+
+
+def rendition_name(name, rendition, extension):
+    stem = PurePosixPath(name).stem
+    return f'recipes/renditions/{stem}_{rendition}.{extension}'
+
+
+def generate_renditions(name):
+    """Создаёт уменьшенные копии изображения и записывает их пути во все
+    рецепты с этим изображением"""
+    renditions = {}
+    try:
+        with default_storage.open(name) as source, \
+                Image.open(source) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+            for rendition, size in RENDITIONS.items():
+                thumbnail = None
+                for image_format, extension in RENDITION_FORMATS:
+                    path = rendition_name(name, rendition, extension)
+                    if not default_storage.exists(path):
+                        if thumbnail is None:
+                            thumbnail = original.copy()
+                            thumbnail.thumbnail(size)
+                        buffer = BytesIO()
+                        thumbnail.save(buffer, image_format, quality=80)
+                        path = default_storage.save(
+                            path, ContentFile(buffer.getvalue()))
+                    renditions.setdefault(rendition, {})[extension] = path
+    except (OSError, ValueError):
+        logger.exception('Не удалось обработать изображение %s', name)
+        return
+    recipes = Recipe.objects.filter(image=name)
+    recipes.update(renditions=renditions)
+    bump_fragments(recipe_ids=recipes.values_list('id', flat=True))
@@ -0,0 +1,49 @@
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from tasks.queue import enqueue, task
+from . import images
+from .models import ShoppingListItem
+from .renderers import SHOPPING_LIST_RENDERERS
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+@task
+def generate_renditions(name):
+    """Создаёт уменьшенные копии загруженного изображения рецепта"""
+    images.generate_renditions(name)
+
+
+@task
+def export_shopping_list(user_id, file_format):
+    """Сохраняет список покупок пользователя в файл хранилища и
+    возвращает ссылку на него; файл удаляется через
+    SHOPPING_LIST_EXPORT_TTL секунд"""
+    renderer = next(renderer for renderer in SHOPPING_LIST_RENDERERS
+                    if renderer.format == file_format)()
+    rows = ShoppingListItem.objects.filter(user=user_id).order_by(
+        'ingredient__name').values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    content = ''.join(renderer.stream(rows)).encode(renderer.charset)
+    # Имя файла нельзя угадать по id пользователя
+    name = default_storage.save(
+        f'exports/shopping_list_{secrets.token_urlsafe(16)}.{file_format}',
+        ContentFile(content)
+    )
+    expires = timezone.now() + timedelta(
+        seconds=settings.SHOPPING_LIST_EXPORT_TTL)
+    enqueue(delete_export, name, run_at=expires)
+    return {'url': default_storage.url(name), 'expires': expires.isoformat()}
+
+
+@task
+def delete_export(name):
+    """Удаляет устаревший файл выгрузки"""
+    default_storage.delete(name)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generates image renditions for recipes that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Обработать все изображения, а не только новые'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(renditions={})
+        names = recipes.values_list('image', flat=True).distinct()
+        total = 0
+        for name in names.iterator():
+            generate_renditions(name)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {total}'
+        ))
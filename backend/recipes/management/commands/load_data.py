@@ -1,21 +1,148 @@
 import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes.cache import bump_version
 from recipes.models import Ingredient
 
+DATA_DIR = Path(settings.BASE_DIR) / 'recipes' / 'data'
+FORMATS = ('csv', 'json')
+
 
 class Command(BaseCommand):
-    help = "Loads ingredients from csv"
-
-    def handle(self, *args, **kwargs):
-        with open('recipes/data/ingredients.csv', 'r', encoding='utf-8') as file:
-            ingredients = csv.reader(file, delimiter=',')
-            for ingredient in ingredients:
-                if len(ingredient) == 2:
-                    Ingredient.objects.get_or_create(
-                        name=ingredient[0], measurement_unit=ingredient[1]
-                    )
-
-        self.stdout.write(self.style.SUCCESS('База данных успешно заполнена'))
-        return 'OK'
+    help = 'Loads ingredients from csv or json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Путь к файлу (по умолчанию recipes/data/ingredients.*)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла (по умолчанию определяется по расширению)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке вставки'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать файл без записи в базу данных'
+        )
+
+    def handle(self, *args, **options):
+        path, file_format = self.get_source(options['path'],
+                                            options['format'])
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        started = time.perf_counter()
+        rows = self.unique_rows(self.read_rows(path, file_format))
+        batches = iter(lambda: list(islice(rows, batch_size)), [])
+        if options['dry_run']:
+            total = sum(len(batch) for batch in batches)
+        elif connection.vendor == 'postgresql':
+            total = self.copy(batches)
+        else:
+            total = self.bulk_create(batches)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'Обработано уникальных строк: {total} за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+        if not options['dry_run']:
+            bump_version('ingredients')
+            self.stdout.write(
+                self.style.SUCCESS('База данных успешно заполнена')
+            )
+
+    @staticmethod
+    def get_source(path, file_format):
+        if path is None:
+            path = DATA_DIR / f'ingredients.{file_format or "csv"}'
+        path = Path(path)
+        if file_format is None:
+            file_format = path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла {path}, укажите --format'
+            )
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        return path, file_format
+
+    @staticmethod
+    def read_rows(path, file_format):
+        """Построчно читает пары (название, единица измерения)"""
+        with open(path, encoding='utf-8') as file:
+            if file_format == 'json':
+                for item in json.load(file):
+                    yield item['name'], item['measurement_unit']
+                return
+            for row in csv.reader(file):
+                if len(row) == 2:
+                    yield row[0], row[1]
+
+    @staticmethod
+    def unique_rows(rows):
+        """Отбрасывает повторы по ограничению unique ingredients"""
+        seen = set()
+        for row in rows:
+            if row not in seen:
+                seen.add(row)
+                yield row
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_create(batches):
+        total = 0
+        for batch in batches:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True
+            )
+            total += len(batch)
+        return total
+
+    @staticmethod
+    @transaction.atomic
+    def copy(batches):
+        """Загружает строки через COPY во временную таблицу PostgreSQL"""
+        table = Ingredient._meta.db_table
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredients_import '
+                '(name varchar(100), measurement_unit varchar(100)) '
+                'ON COMMIT DROP'
+            )
+            for batch in batches:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_import (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT name, measurement_unit FROM ingredients_import '
+                f'ON CONFLICT DO NOTHING'
+            )
+        return total
@@ -0,0 +1,32 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+from recipes.models import FeedEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-user recipe feeds from follows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Пользователей в одной транзакции')
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.exclude(
+            user__in=Follow.objects.values('user')).delete()
+        ids = Follow.objects.order_by('user').values_list(
+            'user', flat=True).distinct().iterator()
+        total = 0
+        for batch in iter(
+            lambda: list(islice(ids, options['batch_size'])), []
+        ):
+            with transaction.atomic():
+                rebuild_feeds(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено лент: {total}'
+        ))
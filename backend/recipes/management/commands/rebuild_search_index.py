@@ -0,0 +1,27 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the recipe full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        ids = Recipe.objects.values_list('pk', flat=True).iterator()
+        total = 0
+        for batch in iter(
+            lambda: list(islice(ids, options['batch_size'])), []
+        ):
+            with transaction.atomic():
+                update_search_index(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {total}'
+        ))
@@ -0,0 +1,31 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-user shopping list totals from shopping carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Пользователей в одной транзакции')
+
+    def handle(self, *args, **options):
+        ShoppingListItem.objects.exclude(
+            user__in=ShoppingCart.objects.values('user')).delete()
+        ids = ShoppingCart.objects.order_by('user').values_list(
+            'user', flat=True).distinct().iterator()
+        total = 0
+        for batch in iter(
+            lambda: list(islice(ids, options['batch_size'])), []
+        ):
+            with transaction.atomic():
+                rebuild_shopping_lists(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано списков покупок: {total}'
+        ))
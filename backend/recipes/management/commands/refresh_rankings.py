@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import refresh_popularity, refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Refreshes precomputed recipe rankings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            default=7,
+            help='За сколько дней учитывать события для trending'
+        )
+        parser.add_argument(
+            '--half-life-hours',
+            type=float,
+            default=24,
+            help='Период полураспада веса события в часах'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        popular = refresh_popularity()
+        trending = refresh_trending(
+            window=timedelta(days=options['window_days']),
+            half_life=timedelta(hours=options['half_life_hours']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: popular {popular}, trending {trending}'
+        ))
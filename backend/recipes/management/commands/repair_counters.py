@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, repair_counter
+
+
+class Command(BaseCommand):
+    help = 'Recomputes denormalized counters and repairs drift'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            repaired = repair_counter(
+                model, field, related_model, related_field
+            )
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено {repaired}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
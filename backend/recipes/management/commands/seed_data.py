@@ -0,0 +1,163 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import bump_version
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+
+class Command(BaseCommand):
+    help = 'Seeds users, recipes, favorites, follows and carts for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=8,
+            help='Наибольшее число ингредиентов в рецепте'
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=500,
+            help='Сколько ингредиентов создать, если справочник пуст'
+        )
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в списке покупок пользователя')
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Префикс имён пользователей и рецептов'
+        )
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Начальное значение генератора')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт')
+        if CustomUser.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix!r} уже есть, '
+                f'укажите другой --prefix'
+            )
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            tags = self.get_tags()
+            ingredients = self.get_ingredients(options['ingredients'])
+            users = self.create_users(prefix, options['users'])
+            recipes = self.create_recipes(
+                prefix, options['recipes'], users, tags, ingredients,
+                options['ingredients_per_recipe']
+            )
+            self.create_links(users, recipes, options)
+        elapsed = time.perf_counter() - started
+
+        for namespace in ('tags', 'ingredients', 'recipe_ingredients'):
+            bump_version(namespace)
+        for command in ('repair_counters', 'refresh_rankings',
+                        'rebuild_search_index', 'rebuild_shopping_lists',
+                        'rebuild_feeds'):
+            call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: '
+            f'{len(recipes)} за {elapsed:.1f} с'
+        ))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def get_tags(self):
+        tags = list(Tag.objects.all())
+        if tags:
+            return tags
+        return self.bulk_create(Tag, (
+            Tag(name=f'Тег {number}', slug=f'tag{number}', color=color)
+            for number, (color, _) in enumerate(Tag.COLOR_CHOICES[:3])
+        ))
+
+    def get_ingredients(self, count):
+        ingredients = list(Ingredient.objects.values_list('pk', flat=True))
+        if ingredients:
+            return ingredients
+        return [ingredient.pk for ingredient in self.bulk_create(
+            Ingredient,
+            (Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+             for number in range(count))
+        )]
+
+    def create_users(self, prefix, count):
+        # Хеширование пароля дорогое, поэтому хеш один на всех
+        password = make_password(prefix)
+        return self.bulk_create(CustomUser, (
+            CustomUser(email=f'{prefix}{number}@seed.ru',
+                       username=f'{prefix}{number}',
+                       first_name='Seed', last_name=str(number),
+                       password=password)
+            for number in range(count)
+        ))
+
+    def create_recipes(self, prefix, count, users, tags, ingredients,
+                       per_recipe):
+        rnd = self.random
+        recipes = self.bulk_create(Recipe, (
+            Recipe(author=rnd.choice(users), name=f'{prefix} рецепт {number}',
+                   text=f'Описание рецепта {number}',
+                   cooking_time=rnd.randint(5, 180))
+            for number in range(count)
+        ))
+        per_recipe = min(per_recipe, len(ingredients))
+        self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient,
+                             amount=rnd.randint(1, 500))
+            for recipe in recipes
+            for ingredient in rnd.sample(
+                ingredients,
+                rnd.randint(max(1, per_recipe // 2), per_recipe)
+            )
+        ))
+        through = Recipe.tags.through
+        self.bulk_create(through, (
+            through(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in rnd.sample(tags, rnd.randint(1, min(2, len(tags))))
+        ))
+        return recipes
+
+    def create_links(self, users, recipes, options):
+        rnd = self.random
+
+        def sample(population, count):
+            return rnd.sample(population, min(count, len(population)))
+
+        for model, count in ((Favorite, options['favorites']),
+                             (ShoppingCart, options['carts'])):
+            self.bulk_create(model, (
+                model(user=user, recipe=recipe)
+                for user in users
+                for recipe in sample(recipes, count)
+            ))
+        self.bulk_create(Follow, (
+            Follow(user=user, author=author)
+            for user in users
+            for author in [
+                author for author in sample(users, options['follows'] + 1)
+                if author != user
+            ][:options['follows']]
+        ))
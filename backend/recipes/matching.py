@@ -0,0 +1,95 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_version, get_version
+from .models import RecipeIngredient
+
+
+def recipe_ingredients_changed():
+    """Строки связей рецептов и ингредиентов добавлены или удалены:
+    индекс перестроится после фиксации транзакции"""
+    transaction.on_commit(lambda: bump_version('recipe_ingredients'))
+
+
+class RecipeMatchIndex:
+    """Инвертированный индекс ингредиент -> отсортированный массив id
+    рецептов в памяти процесса.
+
+    Перестраивается при смене версии связей рецептов и ингредиентов,
+    но не чаще раза в RECIPE_MATCH_INDEX_MAX_AGE секунд.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._built = 0
+        self._postings = {}
+        self._sizes = {}
+
+    def _load(self):
+        version = get_version('recipe_ingredients')
+        with self._lock:
+            stale = time.monotonic() - self._built
+            if self._version != version and (
+                self._version is None
+                or stale >= settings.RECIPE_MATCH_INDEX_MAX_AGE
+            ):
+                self._build()
+                self._version = version
+                self._built = time.monotonic()
+            return self._postings, self._sizes
+
+    def _build(self):
+        postings = {}
+        sizes = Counter()
+        rows = RecipeIngredient.objects.order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator(chunk_size=10000):
+            recipes = postings.get(ingredient_id)
+            if recipes is None:
+                recipes = postings[ingredient_id] = array('q')
+            recipes.append(recipe_id)
+            sizes[recipe_id] += 1
+        self._postings = postings
+        self._sizes = sizes
+
+    def match(self, ingredient_ids):
+        """Ранжирует рецепты по числу имеющихся ингредиентов"""
+        postings, sizes = self._load()
+        counts = Counter()
+        for ingredient_id in set(ingredient_ids):
+            counts.update(postings.get(ingredient_id, ()))
+        return RankedMatches(counts, sizes)
+
+
+class RankedMatches:
+    """Ленивая последовательность (id рецепта, совпало, не хватает),
+    упорядоченная по убыванию совпадений и возрастанию недостающих"""
+    def __init__(self, counts, sizes):
+        self._counts = counts
+        self._sizes = sizes
+
+    def __len__(self):
+        return len(self._counts)
+
+    def _key(self, item):
+        recipe_id, matched = item
+        return matched, matched - self._sizes[recipe_id], recipe_id
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        top = heapq.nlargest(index.stop, self._counts.items(), key=self._key)
+        return [
+            (recipe_id, matched, self._sizes[recipe_id] - matched)
+            for recipe_id, matched in top[index]
+        ]
+
+
+recipe_match_index = RecipeMatchIndex()
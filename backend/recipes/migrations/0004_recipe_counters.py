@@ -0,0 +1,48 @@
+# Generated by Django 4.0.6 on 2026-10-18 18:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'in_carts_count',
+     'recipes', 'ShoppingCart', 'recipe'),
+    ('users', 'CustomUser', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'CustomUser', 'followers_count', 'users', 'Follow', 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, name, field, related_app, related_name, fk in COUNTERS:
+        related_model = apps.get_model(related_app, related_name)
+        apps.get_model(app, name).objects.update(**{field: Coalesce(
+            Subquery(
+                related_model.objects.filter(**{fk: OuterRef('pk')})
+                .order_by().values(fk).annotate(total=Count('pk'))
+                .values('total')
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_name_prefix_index'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:04
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM recipes_recipeingredient '
+    'JOIN recipes_ingredient '
+    'ON recipes_ingredient.id = recipes_recipeingredient.ingredient_id '
+    'WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id'
+)
+POSTGRESQL_FORWARD = (
+    'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+    'USING gin (search_vector)',
+    'UPDATE recipes_recipe SET search_vector = '
+    "setweight(to_tsvector('russian', name), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(({names}), '')), 'B') || "
+    "setweight(to_tsvector('russian', text), 'C')".format(
+        names=INGREDIENT_NAMES_SQL.format(
+            aggregate="string_agg(recipes_ingredient.name, ' ')"
+        )
+    ),
+)
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+    "name, text, ingredients, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_fts (rowid, name, text, ingredients) '
+    "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е'), "
+    "coalesce(({names}), '') FROM recipes_recipe".format(
+        names=INGREDIENT_NAMES_SQL.format(
+            aggregate="group_concat(replace(replace("
+                      "recipes_ingredient.name, 'ё', 'е'), 'Ё', 'Е'), ' ')"
+        )
+    ),
+)
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRESQL_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.instrumentation import serialization
+
+from .cache import content_key, get_version
+
+
+class CachedListMixin:
+    """Отдаёт список справочника из кэша с поддержкой ETag.
+
+    Сериализованный JSON хранится в кэше под текущей версией
+    справочника, версия меняется сигналами моделей. Списки прежних
+    версий вытесняются через REFERENCE_CACHE_TTL секунд.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        version = get_version(self.cache_namespace)
+        etag = quote_etag(f'{self.cache_namespace}-{version!r}')
+        last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            if not isinstance(request.accepted_renderer, JSONRenderer):
+                response = super().list(request, *args, **kwargs)
+            else:
+                response = self.get_cached_response(request, version)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_cached_response(self, request, version):
+        key = content_key(self.cache_namespace, version)
+        content = cache.get(key)
+        if content is None:
+            serializer = self.get_serializer(
+                self.filter_queryset(self.get_queryset()), many=True
+            )
+            with serialization():
+                data = serializer.data
+            content = request.accepted_renderer.render(data)
+            cache.set(key, content, settings.REFERENCE_CACHE_TTL)
+        return HttpResponse(content, content_type='application/json')
@@ -1,7 +1,10 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
 
-from users.models import CustomUser
+from users.models import CustomUser, Follow
 
 
 class Tag(models.Model):
@@ -67,6 +70,54 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного, корзины и подписки"""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author'))),
+        )
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты фиксированным числом
+        запросов"""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def limited_per_author(self, author_ids, limit=None):
+        """Возвращает не более limit последних рецептов каждого автора
+        одним запросом"""
+        queryset = self.filter(author__in=author_ids)
+        if limit is None:
+            return queryset
+        queryset = queryset.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=F('id').desc(),
+        ))
+        sql, params = queryset.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            f'WHERE ranked.row_number <= %s ORDER BY ranked.id DESC',
+            (*params, limit)
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         CustomUser,
@@ -84,6 +135,11 @@ class Recipe(models.Model):
         upload_to='recipes/',
         blank=True
     )
+    renditions = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        editable=False
+    )
     text = models.TextField(
         'Описание',
         help_text='Введите описания рецепта',
@@ -103,11 +159,42 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Ингредиенты'
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    popularity = models.PositiveIntegerField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
+    trending = models.FloatField(
+        'Рейтинг за последние дни',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-popularity', '-id'],
+                         name='recipe_popularity_idx'),
+            models.Index(fields=['-trending', '-id'],
+                         name='recipe_trending_idx'),
+            models.Index(fields=['cooking_time', 'id'],
+                         name='recipe_cooking_time_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -125,6 +212,11 @@ class Favorite(models.Model):
         verbose_name='Рецепт',
         related_name='favorites'
     )
+    created = models.DateTimeField(
+        'Добавлено',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['-id']
@@ -181,6 +273,11 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='shopping_cart'
     )
+    created = models.DateTimeField(
+        'Добавлено',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['-id']
@@ -190,3 +287,56 @@ class ShoppingCart(models.Model):
             models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_shopping_cart')
         ]
+
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя.
+
+    Строки пересчитываются сигналами при изменении корзины и
+    ингредиентов рецептов в корзине, см. recipes.shopping_list.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_list_item')
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика автора.
+
+    Строки создаются при публикации рецепта (fan-out при записи) и при
+    подписке, удаляются при отписке, см. recipes.feed.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='feed'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
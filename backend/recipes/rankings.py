@@ -0,0 +1,43 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart
+
+POPULARITY = F('favorites_count') + F('in_carts_count')
+
+
+def refresh_popularity():
+    """Обновляет популярность только у изменившихся рецептов"""
+    return Recipe.objects.exclude(
+        popularity=POPULARITY
+    ).update(popularity=POPULARITY)
+
+
+def trending_scores(since, now, half_life):
+    """Сумма событий избранного и корзины с затуханием по времени"""
+    scores = defaultdict(float)
+    for model in (Favorite, ShoppingCart):
+        events = model.objects.filter(created__gte=since).values_list(
+            'recipe_id', 'created'
+        ).order_by()
+        for recipe_id, created in events.iterator():
+            scores[recipe_id] += 0.5 ** ((now - created) / half_life)
+    return scores
+
+
+def refresh_trending(window=timedelta(days=7), half_life=timedelta(days=1),
+                     batch_size=1000):
+    """Пересчитывает рейтинг рецептов с событиями за окно window и
+    обнуляет рейтинг остальных"""
+    now = timezone.now()
+    scores = trending_scores(now - window, now, half_life)
+    stale = set(
+        Recipe.objects.filter(trending__gt=0).values_list('pk', flat=True)
+    ) - scores.keys()
+    recipes = [Recipe(pk=pk, trending=score) for pk, score in scores.items()]
+    recipes += [Recipe(pk=pk, trending=0) for pk in stale]
+    Recipe.objects.bulk_update(recipes, ['trending'], batch_size=batch_size)
+    return len(recipes)
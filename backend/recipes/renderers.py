@@ -0,0 +1,72 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый потоковый рендерер списка покупок.
+
+    Строки списка — кортежи (название, единица измерения, количество).
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def stream(self, rows):
+        raise NotImplementedError(
+            'ShoppingListRenderer.stream() must be implemented.'
+        )
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for name, measurement_unit, amount in rows:
+            yield f'{name} {amount} - {measurement_unit}\r\n'
+
+
+class _Echo:
+    """Буфер для csv.writer, возвращающий записанную строку"""
+    @staticmethod
+    def write(value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('Ингредиент', 'Единица измерения', 'Количество')
+
+    def stream(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.header)
+        for name, measurement_unit, amount in rows:
+            yield writer.writerow((name, measurement_unit, amount))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for name, measurement_unit, amount in rows:
+            item = json.dumps({
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            }, ensure_ascii=False)
+            yield f'{separator}{item}'
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+)
@@ -0,0 +1,126 @@
+import re
+import threading
+from contextlib import contextmanager
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+# Веса столбцов FTS5 для bm25: название, описание, ингредиенты
+FTS_WEIGHTS = '10.0, 1.0, 5.0'
+
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM recipes_recipeingredient '
+    'JOIN recipes_ingredient '
+    'ON recipes_ingredient.id = recipes_recipeingredient.ingredient_id '
+    'WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id'
+)
+POSTGRESQL_NAMES_SQL = INGREDIENT_NAMES_SQL.format(
+    aggregate="string_agg(recipes_ingredient.name, ' ')"
+)
+POSTGRESQL_UPDATE_SQL = (
+    'UPDATE recipes_recipe SET search_vector = '
+    "setweight(to_tsvector('{config}', name), 'A') || "
+    "setweight(to_tsvector('{config}', "
+    "coalesce(({names}), '')), 'B') || "
+    "setweight(to_tsvector('{config}', text), 'C') "
+    'WHERE id = ANY(%s)'
+).format(config=SEARCH_CONFIG, names=POSTGRESQL_NAMES_SQL)
+
+
+def fold(column):
+    """Заменяет ё на е: токенизатор FTS5 не считает их одной буквой"""
+    return "replace(replace({0}, 'ё', 'е'), 'Ё', 'Е')".format(column)
+
+
+SQLITE_NAMES_SQL = INGREDIENT_NAMES_SQL.format(
+    aggregate="group_concat({0}, ' ')".format(
+        fold('recipes_ingredient.name'))
+)
+SQLITE_INSERT_SQL = (
+    'INSERT INTO {table} (rowid, name, text, ingredients) '
+    "SELECT id, {name}, {text}, coalesce(({names}), '') "
+    'FROM recipes_recipe WHERE id IN ({{placeholders}})'
+).format(table=FTS_TABLE, name=fold('name'), text=fold('text'),
+         names=SQLITE_NAMES_SQL)
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_index_updates():
+    """Копит вызовы update_search_index внутри блока и выполняет их
+    одним пересчётом при успешном выходе"""
+    if getattr(_deferred, 'recipe_ids', None) is not None:
+        yield
+        return
+    _deferred.recipe_ids = recipe_ids = set()
+    try:
+        yield
+    finally:
+        _deferred.recipe_ids = None
+    update_search_index(recipe_ids)
+
+
+def update_search_index(recipe_ids):
+    """Пересчитывает поисковый индекс указанных рецептов"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    pending = getattr(_deferred, 'recipe_ids', None)
+    if pending is not None:
+        pending.update(recipe_ids)
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRESQL_UPDATE_SQL, [recipe_ids])
+        elif connection.vendor == 'sqlite':
+            placeholders = ', '.join(['%s'] * len(recipe_ids))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids
+            )
+            cursor.execute(
+                SQLITE_INSERT_SQL.format(placeholders=placeholders),
+                recipe_ids
+            )
+
+
+def remove_from_search_index(recipe_id):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id]
+            )
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, и аннотирует их
+    релевантностью search_rank (больше — лучше)"""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        )
+    if connection.vendor == 'sqlite':
+        words = re.findall(r'\w+', query.replace('ё', 'е').replace('Ё', 'Е'))
+        if not words:
+            return queryset.annotate(search_rank=Value(0.0)).none()
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id',
+            (match,)
+        ))
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).annotate(search_rank=Value(0.0))
@@ -1,15 +1,48 @@
+from django.db import transaction
 from drf_base64.fields import Base64ImageField
 from rest_framework import exceptions, serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from tasks.queue import enqueue
 from users.mixins import SubscribeMixin
 from users.models import Follow
 from users.serializers import CustomUserSerializer
-from .models import (Favorite, Ingredient, Recipe,
-                     RecipeIngredient, ShoppingCart, Tag)
+from .fields import RecipeImageField, RenditionsField
+from .images import DecodedImage, store_image
+from .jobs import generate_renditions
+from .matching import recipe_ingredients_changed
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem, Tag)
+from .renderers import SHOPPING_LIST_RENDERERS, TextShoppingListRenderer
+from .search import deferred_index_updates, update_search_index
+from .shopping_list import (deferred_shopping_list_updates,
+                            recipe_ingredients_updated)
 from .utils import double_checker
 
 
+BATCH_MAX_SIZE = 100
+
+
+class BatchSerializer(serializers.Serializer):
+    """Список id для пакетного добавления, повторы отбрасываются"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
+
+
+class ShoppingListExportSerializer(serializers.Serializer):
+    """Формат файла списка покупок для фоновой выгрузки"""
+    format = serializers.ChoiceField(
+        choices=[renderer.format for renderer in SHOPPING_LIST_RENDERERS],
+        default=TextShoppingListRenderer.format
+    )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для тегов рецептов"""
     slug = serializers.SlugField()
@@ -27,6 +60,19 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор строк списка покупок"""
+    id = serializers.ReadOnlyField(source='ingredient_id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для вывода ингредиентов рецепта"""
     id = serializers.PrimaryKeyRelatedField(
@@ -55,7 +101,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 class RecipeCreateIngredientSerializer(serializers.ModelSerializer):
     """Сериализотор для создания ингредиентов рецепта"""
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -73,11 +119,10 @@ class RecipeCreateIngredientSerializer(serializers.ModelSerializer):
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания рецептов"""
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeCreateIngredientSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     name = serializers.CharField(max_length=200)
     cooking_time = serializers.IntegerField()
 
@@ -93,6 +138,31 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         ]
 
+    @staticmethod
+    def validate_ingredients(value):
+        """Проверяет все ингредиенты одним запросом"""
+        found = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in value}
+        )
+        for ingredient in value:
+            if ingredient['id'] not in found:
+                raise exceptions.ValidationError(
+                    f'Ингредиента с id {ingredient["id"]} не существует!'
+                )
+            ingredient['id'] = found[ingredient['id']]
+        return value
+
+    @staticmethod
+    def validate_tags(value):
+        """Проверяет все теги одним запросом"""
+        found = Tag.objects.in_bulk(value)
+        for tag_id in value:
+            if tag_id not in found:
+                raise exceptions.ValidationError(
+                    f'Тега с id {tag_id} не существует!'
+                )
+        return [found[tag_id] for tag_id in value]
+
     def validate(self, data):
         ingredients = data['ingredients']
         tags = data['tags']
@@ -120,25 +190,87 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
             ingredient_list.append(recipe_ingredient)
         RecipeIngredient.objects.bulk_create(ingredient_list)
+        recipe_ingredients_changed()
 
+    @staticmethod
+    def sync_ingredients(ingredients, recipe):
+        """Приводит ингредиенты рецепта к новому списку, затрагивая
+        только изменившиеся строки"""
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredient.all()
+        }
+        incoming = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_create = []
+        to_update = []
+        for ingredient_id, amount in incoming.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ))
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        to_delete = current.keys() - incoming.keys()
+        if to_delete:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=to_delete
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+            recipe_ingredients_changed()
+        # bulk_update и bulk_create не отправляют сигналы
+        recipe_ingredients_updated(recipe.pk, {
+            recipe_ingredient.ingredient_id
+            for recipe_ingredient in to_update + to_create
+        })
+
+    @staticmethod
+    def save_image(validated_data):
+        """Сохраняет загруженное изображение и ставит его обработку
+        в очередь после фиксации транзакции"""
+        image = validated_data.get('image')
+        if isinstance(image, DecodedImage):
+            name = store_image(image)
+            validated_data['image'] = name
+            validated_data['renditions'] = {}
+            transaction.on_commit(
+                lambda: enqueue(generate_renditions, name))
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-        self.create_ingredients(ingredients, recipe)
+        self.save_image(validated_data)
+        with deferred_index_updates():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.set(tags)
+            self.create_ingredients(ingredients, recipe)
+            update_search_index([recipe.pk])
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.ingredients.clear()
-        recipe.tags.clear()
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        self.create_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
-        return super().update(recipe, validated_data)
+        self.save_image(validated_data)
+        with deferred_index_updates(), deferred_shopping_list_updates():
+            self.sync_ingredients(ingredients, recipe)
+            recipe.tags.set(tags)
+            return super().update(recipe, validated_data)
 
     def to_representation(self, value):
+        value = Recipe.objects.with_user_flags(
+            self.context['request'].user
+        ).with_related().get(pk=value.pk)
         serializer = RecipeGetSerializer(value, context=self.context)
         return serializer.data
 
@@ -154,20 +286,30 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'renditions',
+                  'text', 'cooking_time')
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return Favorite.objects.filter(user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -177,13 +319,26 @@ class RecipeGetSerializer(serializers.ModelSerializer):
 class RecipeListSerializer(serializers.ModelSerializer):
     """Сериализатор для краткого вывода информации о рецепте в подписках"""
     image = Base64ImageField()
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'renditions', 'cooking_time',)
         read_only_fields = ('id', 'name', 'image', 'cooking_time',)
 
 
+class RecipeMatchSerializer(RecipeListSerializer):
+    """Сериализатор рецептов, подобранных по имеющимся ингредиентам"""
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + (
+            'matched_count', 'missing_count', 'missing_ingredients'
+        )
+
+
 class SubscriptionSerializer(serializers.ModelSerializer, SubscribeMixin):
     """Сериализатор подписок"""
     id = serializers.ReadOnlyField(source='author.id')
@@ -201,16 +356,20 @@ class SubscriptionSerializer(serializers.ModelSerializer, SubscribeMixin):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
+        recipes = self.context.get('recipes')
+        if recipes is not None:
+            queryset = recipes.get(obj.author_id, [])
+        else:
+            request = self.context.get('request')
+            limit = request.GET.get('recipes_limit')
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit:
+                queryset = queryset[:int(limit)]
         return RecipeListSerializer(queryset, many=True).data
 
     @staticmethod
     def get_recipes_count(obj):
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -0,0 +1,159 @@
+import threading
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+_state = threading.local()
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids=None):
+    """Пересчитывает строки списков покупок пользователей по ингредиентам,
+    без ingredient_ids - списки целиком.
+
+    user_ids и ingredient_ids - списки или подзапросы; число запросов
+    к БД не зависит от их размера. Строки пользователей блокируются до
+    конца транзакции, чтобы параллельные пересчёты одного списка не
+    вставили одни и те же строки дважды.
+    """
+    with transaction.atomic(savepoint=False):
+        _refresh_shopping_lists(user_ids, ingredient_ids)
+
+
+def _refresh_shopping_lists(user_ids, ingredient_ids):
+    user_ids = list(get_user_model().objects.select_for_update().filter(
+        pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+    if not user_ids:
+        return
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user__in=user_ids)
+    items = ShoppingListItem.objects.filter(user__in=user_ids)
+    if ingredient_ids is not None:
+        totals = totals.filter(ingredient__in=ingredient_ids)
+        items = items.filter(ingredient__in=ingredient_ids)
+    totals = [
+        ShoppingListItem(user_id=row['recipe__shopping_cart__user'],
+                         ingredient_id=row['ingredient'],
+                         amount=row['total'])
+        for row in totals.values(
+            'recipe__shopping_cart__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by()
+    ]
+    items.delete()
+    ShoppingListItem.objects.bulk_create(totals)
+
+
+def rebuild_shopping_lists(user_ids=None):
+    """Пересчитывает списки покупок пользователей, без user_ids - все"""
+    if user_ids is None:
+        ShoppingListItem.objects.exclude(
+            user__in=ShoppingCart.objects.values('user')).delete()
+        user_ids = ShoppingCart.objects.values('user')
+    refresh_shopping_lists(user_ids)
+
+
+def cart_changed(user_id, recipe_ids):
+    """Рецепты добавлены в корзину пользователя или удалены из неё"""
+    recipe_ids = [pk for pk in recipe_ids if not _is_deleting(pk)]
+    if not recipe_ids:
+        return
+    refresh_shopping_lists(
+        [user_id],
+        RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids).values('ingredient')
+    )
+
+
+def recipe_ingredients_updated(recipe_id, ingredient_ids):
+    """Ингредиенты рецепта изменились: пересчитывает их у всех
+    пользователей, у которых рецепт в корзине"""
+    if not ingredient_ids or _is_deleting(recipe_id):
+        return
+    pending = getattr(_state, 'recipes', None)
+    if pending is not None:
+        pending[recipe_id].update(ingredient_ids)
+        return
+    refresh_shopping_lists(
+        ShoppingCart.objects.filter(recipe=recipe_id).values('user'),
+        list(ingredient_ids)
+    )
+
+
+@contextmanager
+def deferred_shopping_list_updates():
+    """Копит вызовы recipe_ingredients_updated внутри блока и выполняет
+    их по одному на рецепт при успешном выходе"""
+    if getattr(_state, 'recipes', None) is not None:
+        yield
+        return
+    _state.recipes = recipes = defaultdict(set)
+    try:
+        yield
+    finally:
+        _state.recipes = None
+    for recipe_id, ingredient_ids in recipes.items():
+        recipe_ingredients_updated(recipe_id, ingredient_ids)
+
+
+def _deleting():
+    if not hasattr(_state, 'deleting'):
+        _state.deleting = {}
+    return _state.deleting
+
+
+class _Forget:
+    """Обработчик on_commit, снимающий отметку удаления рецепта"""
+    def __init__(self, recipe_id):
+        self.recipe_id = recipe_id
+
+    def __call__(self):
+        entry = _deleting().get(self.recipe_id)
+        if entry is not None and entry[2]() is self:
+            del _deleting()[self.recipe_id]
+
+
+def _is_deleting(recipe_id):
+    """Рецепт удаляется в текущей транзакции.
+
+    Отметка удаления ссылается на свой обработчик on_commit слабой
+    ссылкой. При откате транзакции или точки сохранения Django
+    отбрасывает обработчики, ссылка умирает, и отметка перестаёт
+    действовать, даже если post_delete так и не пришёл.
+    """
+    entry = _deleting().get(recipe_id)
+    if entry is None:
+        return False
+    if entry[2]() is not None:
+        return True
+    _deleting().pop(recipe_id, None)
+    return False
+
+
+def before_recipe_delete(recipe_id):
+    """Запоминает корзины и ингредиенты удаляемого рецепта.
+
+    Каскадное удаление строк корзины и ингредиентов рецепта списки не
+    пересчитывает, это делается один раз в after_recipe_delete.
+    Вызывается внутри транзакции удаления.
+    """
+    forget = _Forget(recipe_id)
+    _deleting()[recipe_id] = (
+        list(ShoppingCart.objects.filter(
+            recipe=recipe_id).values_list('user', flat=True)),
+        list(RecipeIngredient.objects.filter(
+            recipe=recipe_id).values_list('ingredient', flat=True)),
+        weakref.ref(forget),
+    )
+    # Сильная ссылка на обработчик остаётся только у Django
+    transaction.on_commit(forget)
+
+
+def after_recipe_delete(recipe_id):
+    user_ids, ingredient_ids, _ = _deleting().pop(recipe_id, ((), (), None))
+    if user_ids and ingredient_ids:
+        refresh_shopping_lists(user_ids, ingredient_ids)
@@ -0,0 +1,132 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from users.models import CustomUser, Follow
+from .cache import bump_fragments, bump_version
+from .counters import COUNTERS, change_counter
+from .feed import backfill, fan_out, trim
+from .matching import recipe_ingredients_changed
+from .models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                     Tag)
+from .search import remove_from_search_index, update_search_index
+from .shopping_list import (after_recipe_delete, before_recipe_delete,
+                            cart_changed, recipe_ingredients_updated)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(instance, **kwargs):
+    bump_version('ingredients')
+    if not kwargs.get('created', False):
+        update_search_index(
+            instance.recipes.values_list('pk', flat=True)
+        )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    bump_version('tags')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    update_search_index([instance.pk])
+    bump_fragments(recipe_ids=[instance.pk])
+    if created:
+        fan_out(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    before_recipe_delete(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    remove_from_search_index(instance.pk)
+    after_recipe_delete(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            bump_fragments(recipe_ids=[instance.pk])
+    elif action == 'pre_clear':
+        bump_fragments(recipe_ids=instance.recipes.values_list(
+            'pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        bump_fragments(recipe_ids=pk_set)
+
+
+@receiver(post_save, sender=CustomUser)
+def author_saved(instance, created, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login
+    if not created and update_fields != frozenset({'last_login'}):
+        bump_fragments(author_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(instance, **kwargs):
+    # Ингредиент строки можно заменить в админке, тогда пересчитывается
+    # и прежний
+    if instance.pk is not None:
+        instance.previous_ingredient_id = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient', flat=True).first()
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    update_search_index([instance.recipe_id])
+    # Индекс подбора хранит только пары рецепт-ингредиент: строка
+    # добавлена, удалена (у post_delete нет created) или ингредиент
+    # заменён; изменение количества его не касается
+    previous = getattr(instance, 'previous_ingredient_id', None)
+    if kwargs.get('created', True) or previous != instance.ingredient_id:
+        recipe_ingredients_changed()
+    bump_fragments(recipe_ids=[instance.recipe_id])
+    recipe_ingredients_updated(instance.recipe_id, {
+        instance.ingredient_id,
+        getattr(instance, 'previous_ingredient_id', None)
+    } - {None})
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def cart_updated(instance, **kwargs):
+    if kwargs.get('created', True):
+        cart_changed(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(instance, created, **kwargs):
+    if created:
+        backfill(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    trim(instance.user_id, instance.author_id)
+
+
+def connect_counter(model, field, related_model, related_field):
+    """Поддерживает счётчик field модели model при создании и удалении
+    строк related_model"""
+    attname = related_model._meta.get_field(related_field).attname
+
+    def created(instance, created, **kwargs):
+        if created:
+            change_counter(model, getattr(instance, attname), field, 1)
+
+    def deleted(instance, **kwargs):
+        change_counter(model, getattr(instance, attname), field, -1)
+
+    uid = f'{model.__name__}.{field}'
+    post_save.connect(created, sender=related_model, weak=False,
+                      dispatch_uid=f'{uid}.created')
+    post_delete.connect(deleted, sender=related_model, weak=False,
+                        dispatch_uid=f'{uid}.deleted')
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
@@ -0,0 +1,186 @@
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+
+def fetch(method, url, **headers):
+    """Запрос к ASGI-обработчику из синхронного теста"""
+    async def request():
+        return await getattr(AsyncClient(), method)(url, **headers)
+    return async_to_sync(request)()
+
+
+def serve(path, query_string=b'', **headers):
+    """Запрос к ASGIHandler, как от сервера: тело ответа читается из
+    сообщений http.response.body в цикле событий, а не в потоке, как у
+    AsyncClient. Возвращает статус и тело целиком"""
+    async def request():
+        communicator = ApplicationCommunicator(ASGIHandler(), {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': query_string, 'server': ('testserver', 80),
+            'headers': [(name.encode(), value.encode())
+                        for name, value in headers.items()],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(5)
+        body = b''
+        more_body = True
+        while more_body:
+            message = await communicator.receive_output(5)
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+        return start['status'], body
+
+    # Как и тестовый клиент, соединение теста не закрывается по сигналам
+    # начала и конца запроса
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        return async_to_sync(request)()
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+def create_data(test):
+    test.user, test.author = (
+        CustomUser.objects.create(
+            email=f'{name}@test.ru', username=name,
+            first_name='User', last_name='Test'
+        ) for name in ('reader', 'author')
+    )
+    test.token = Token.objects.create(user=test.user)
+    Follow.objects.create(user=test.user, author=test.author)
+    tags = [Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}',
+                               color=color)
+            for number, (color, _) in enumerate(Tag.COLOR_CHOICES[:2])]
+    ingredients = [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in ('мука', 'молоко', 'масло')
+    ]
+    for number in range(8):
+        recipe = Recipe.objects.create(
+            author=test.author, name=f'Рецепт {number}', text='Описание',
+            cooking_time=5 + number
+        )
+        recipe.tags.set(tags[:number % 2 + 1])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=number + 1)
+            for ingredient in ingredients[:number % 3 + 1]
+        )
+    test.recipe = recipe
+
+
+URLS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2&limit=3',
+    '/api/recipes/?tags=tag1&limit=2',
+    '/api/recipes/?page=9',
+    '/api/tags/',
+    '/api/ingredients/?name=мо',
+    '/api/users/subscriptions/?recipes_limit=2',
+)
+
+
+@override_settings(ROOT_URLCONF='foodgram.asgi_urls',
+                   ASYNC_DB_CONCURRENCY=False)
+class AsyncReadTests(APITestCase):
+    """Асинхронные представления отвечают так же, как синхронные"""
+    @classmethod
+    def setUpTestData(cls):
+        create_data(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def async_get(self, url, token=None):
+        headers = {'authorization': f'Token {token.key}'} if token else {}
+        return fetch('get', url, **headers)
+
+    def sync_get(self, url, token=None):
+        with override_settings(ROOT_URLCONF='foodgram.urls'):
+            self.client.credentials(
+                **({'HTTP_AUTHORIZATION': f'Token {token.key}'}
+                   if token else {})
+            )
+            return self.client.get(url)
+
+    def test_same_responses(self):
+        urls = URLS + (f'/api/recipes/{self.recipe.id}/', '/api/recipes/0/')
+        for token in (None, self.token):
+            for url in urls:
+                with self.subTest(url=url, token=token):
+                    expected = self.sync_get(url, token)
+                    response = self.async_get(url, token)
+                    self.assertEqual(response.status_code,
+                                     expected.status_code)
+                    self.assertEqual(json.loads(response.content),
+                                     json.loads(expected.content))
+
+    def test_user_flags(self):
+        response = self.async_get(f'/api/recipes/{self.recipe.id}/',
+                                  self.token)
+        self.assertIs(response.json()['author']['is_subscribed'], True)
+        self.assertEqual(len(response.json()['ingredients']), 2)
+
+    def test_fallback_to_viewset(self):
+        self.assertEqual(
+            self.async_get('/api/recipes/?page=last').status_code, 200)
+        self.assertEqual(
+            self.async_get('/api/recipes/?format=api').status_code, 200)
+        response = fetch('post', '/api/recipes/')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(ROOT_URLCONF='foodgram.asgi_urls',
+                   ASYNC_DB_CONCURRENCY=True)
+class ConcurrentReadTests(TransactionTestCase):
+    """Запросы к БД выполняются в потоках пула"""
+    def setUp(self):
+        create_data(self)
+        cache.clear()
+
+    def test_concurrent_queries(self):
+        response = fetch('get', '/api/recipes/?limit=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 8)
+        self.assertEqual(len(response.json()['results']), 3)
+        response = fetch(
+            'get', '/api/users/subscriptions/',
+            authorization=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.json()['results'][0]['recipes_count'], 8)
+
+
+@override_settings(ROOT_URLCONF='foodgram.asgi_urls')
+class StreamingResponseTests(TransactionTestCase):
+    """Потоковый ответ под ASGI отдаётся целиком: ASGIHandler перебирает
+    его в цикле событий, где запросы к БД запрещены"""
+    def setUp(self):
+        create_data(self)
+
+    def test_streaming_download(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        status, body = serve(
+            '/api/recipes/download_shopping_cart/', b'format=csv',
+            authorization=f'Token {self.token.key}'
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(body.decode().splitlines(), [
+            'Ингредиент,Единица измерения,Количество',
+            'молоко,г,8',
+            'мука,г,8',
+        ])
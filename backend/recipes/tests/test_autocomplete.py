@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+
+class IngredientAutocompleteTests(APITestCase):
+    """Поиск ингредиентов по префиксному индексу в памяти"""
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Сахар', 'сахарная пудра', 'ванильный сахар',
+                     'соль', 'ёжевика'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+        cls.url = reverse('recipes:ingredients-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, name):
+        response = self.client.get(self.url, {'name': name})
+        return [item['name'] for item in response.data]
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(self.search('САХ'),
+                         ['Сахар', 'сахарная пудра', 'ванильный сахар'])
+        self.assertEqual(self.search('ежев'), ['ёжевика'])
+
+    def test_no_queries_after_build(self):
+        self.search('с')
+        with self.assertNumQueries(0):
+            self.search('со')
+
+    def test_invalidated_by_signals(self):
+        self.assertEqual(self.search('мёд'), [])
+        honey = Ingredient.objects.create(name='мёд', measurement_unit='г')
+        self.assertEqual(self.search('мёд'), ['мёд'])
+        honey.delete()
+        self.assertEqual(self.search('мёд'), [])
+
+    def test_list_without_name(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_database_fallback(self):
+        with self.settings(INGREDIENT_SEARCH_IN_MEMORY=False):
+            self.assertEqual(self.search('со'), ['соль'])
@@ -0,0 +1,116 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, ShoppingListItem)
+from users.models import CustomUser, Follow
+
+
+class BatchTests(APITestCase):
+    """Пакетное добавление в избранное, корзину и подписки: проверка и
+    вставка за фиксированное число запросов, результат по каждому id"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='user@test.ru', username='user',
+            first_name='User', last_name='Test'
+        )
+        cls.authors = [
+            CustomUser.objects.create(
+                email=f'author{number}@test.ru', username=f'author{number}',
+                first_name='Author', last_name='Test'
+            ) for number in range(3)
+        ]
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        cls.recipes = []
+        for number in range(10):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % 3], name=f'Рецепт {number}',
+                text='Описание', cooking_time=5
+            )
+            RecipeIngredient.objects.create(recipe=recipe,
+                                            ingredient=ingredient, amount=10)
+            cls.recipes.append(recipe)
+        cls.ids = [recipe.id for recipe in cls.recipes]
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, url_name, ids):
+        return self.client.post(reverse(url_name), {'ids': ids},
+                                format='json')
+
+    def test_favorites(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        response = self.post('recipes:recipes-favorite-batch',
+                             self.ids[:2] + [10 ** 9, self.ids[1]])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': self.ids[0], 'status': 'exists'},
+            {'id': self.ids[1], 'status': 'created'},
+            {'id': 10 ** 9, 'status': 'not_found'},
+        ])
+        self.assertEqual(
+            Recipe.objects.get(pk=self.ids[1]).favorites_count, 1)
+
+    def test_shopping_cart(self):
+        response = self.post('recipes:recipes-shopping-cart-batch',
+                             self.ids[:3])
+        self.assertEqual(
+            [item['status'] for item in response.data['results']],
+            ['created'] * 3
+        )
+        self.assertEqual(ShoppingCart.objects.filter(user=self.user).count(),
+                         3)
+        self.assertEqual(
+            ShoppingListItem.objects.get(user=self.user).amount, 30)
+        self.assertEqual(Recipe.objects.get(pk=self.ids[0]).in_carts_count,
+                         1)
+        # Повторная отправка ничего не меняет
+        response = self.post('recipes:recipes-shopping-cart-batch',
+                             self.ids[:3])
+        self.assertEqual(
+            [item['status'] for item in response.data['results']],
+            ['exists'] * 3
+        )
+        self.assertEqual(
+            ShoppingListItem.objects.get(user=self.user).amount, 30)
+
+    def test_queries_independent_of_size(self):
+        url = 'recipes:recipes-shopping-cart-batch'
+        with self.assertNumQueries(9):
+            self.post(url, self.ids[:1])
+        ShoppingCart.objects.all().delete()
+        with self.assertNumQueries(9):
+            self.post(url, self.ids)
+
+    def test_subscriptions(self):
+        ids = [author.id for author in self.authors[:2]] + [self.user.id]
+        response = self.post('users:users-subscribe-batch', ids)
+        self.assertEqual(response.data['results'], [
+            {'id': ids[0], 'status': 'created'},
+            {'id': ids[1], 'status': 'created'},
+            {'id': self.user.id, 'status': 'error',
+             'errors': 'Вы не можете подписываться на самого себя'},
+        ])
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            CustomUser.objects.get(pk=ids[0]).followers_count, 1)
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('recipe', flat=True)),
+            {recipe.id for recipe in self.recipes
+             if recipe.author_id in ids}
+        )
+
+    def test_invalid(self):
+        for ids in ([], ['a'], [-1], list(range(1, 102)), 'abc'):
+            with self.subTest(ids=ids):
+                response = self.post('recipes:recipes-favorite-batch', ids)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.data)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(user=None)
+        response = self.post('recipes:recipes-favorite-batch', self.ids)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+
+class CounterTests(TestCase):
+    """Денормализованные счётчики рецептов и пользователей"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name=name, last_name=name
+            )
+            for name in ('author', 'reader')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=5
+        )
+
+    def assert_counters(self, recipe, user):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.in_carts_count),
+            recipe
+        )
+        self.assertEqual(
+            (self.author.recipes_count, self.author.followers_count), user
+        )
+
+    def test_signals(self):
+        self.assert_counters((0, 0), (1, 0))
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assert_counters((1, 1), (1, 1))
+        Favorite.objects.filter(user=self.reader).delete()
+        ShoppingCart.objects.filter(user=self.reader).delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assert_counters((0, 0), (1, 0))
+        Recipe.objects.create(author=self.author, name='Второй',
+                              text='Описание', cooking_time=5)
+        self.assert_counters((0, 0), (2, 0))
+
+    def test_repair_counters(self):
+        Favorite.objects.bulk_create(
+            [Favorite(user=self.reader, recipe=self.recipe)])
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)])
+        CustomUser.objects.filter(pk=self.author.pk).update(recipes_count=7)
+        call_command('repair_counters', stdout=StringIO())
+        self.assert_counters((1, 0), (1, 1))
@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import FeedEntry, Ingredient, Recipe, Tag
+from recipes.tests.test_images import image_data
+from users.models import CustomUser, Follow
+
+
+class FeedTests(APITestCase):
+    """Лента подписок: fan-out при публикации, заполнение и очистка при
+    подписке и отписке, рецепты крупных авторов при чтении"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, cls.star, cls.stranger = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name='User', last_name='Test'
+            ) for name in ('reader', 'author', 'star', 'stranger')
+        )
+        cls.url = reverse('recipes:recipes-feed')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def create_recipe(self, author, name='Рецепт'):
+        return Recipe.objects.create(author=author, name=name,
+                                     text='Описание', cooking_time=5)
+
+    def feed_ids(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_fan_out_on_publish(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        recipe = self.create_recipe(self.author)
+        self.create_recipe(self.stranger)
+        self.assertEqual(self.feed_ids(), [recipe.id])
+        recipe.delete()
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_fan_out_within_budget(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        tag = Tag.objects.create(name='Обед', slug='lunch', color=Tag.GREEN)
+        ingredient = Ingredient.objects.create(name='соль',
+                                               measurement_unit='г')
+        self.client.force_authenticate(user=self.author)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        # Бюджет запросов create проверяется тестовым раннером
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(reverse('recipes:recipes-list'), {
+                'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+                'tags': [tag.id], 'image': image_data(),
+                'ingredients': [{'id': ingredient.id, 'amount': 1}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.feed_ids(), [response.data['id']])
+
+    @override_settings(FEED_BACKFILL_SIZE=2)
+    def test_follow_and_unfollow(self):
+        recipes = [self.create_recipe(self.author, f'Рецепт {number}')
+                   for number in range(3)]
+        subscribe = reverse('users:users-subscribe', args=(self.author.id,))
+        self.client.post(subscribe)
+        self.assertEqual(self.feed_ids(), [recipes[2].id, recipes[1].id])
+        self.client.delete(subscribe)
+        self.assertEqual(self.feed_ids(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_large_author_merged_on_read(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.star)
+        Follow.objects.create(user=self.stranger, author=self.star)
+        recipes = [self.create_recipe(author) for author in
+                   (self.author, self.star) * 2]
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('recipe', flat=True)),
+            {recipes[0].id, recipes[2].id}
+        )
+        self.assertEqual(self.feed_ids(),
+                         [recipe.id for recipe in reversed(recipes)])
+        self.assertEqual(
+            self.feed_ids(f'{self.url}?limit=2&cursor='),
+            [recipes[3].id, recipes[2].id]
+        )
+
+    def test_keyset_pages(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.star)
+        recipes = [self.create_recipe(author) for author in
+                   (self.author, self.star) * 4]
+        ids, url = [], f'{self.url}?limit=3'
+        # star стал крупным автором: его рецепты есть и в таблице, и
+        # подмешиваются при чтении
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(response.data['results']), 3)
+                ids += [recipe['id'] for recipe in response.data['results']]
+                url = response.data['next']
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_invalid_cursor(self):
+        for cursor in ('bad', 'WyJhIl0='):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        recipe = self.create_recipe(self.author)
+        FeedEntry.objects.all().delete()
+        FeedEntry.objects.create(user=self.stranger, recipe=recipe)
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'recipe')),
+            [(self.user.id, recipe.id)]
+        )
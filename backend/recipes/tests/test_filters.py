@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from recipes.filters import RecipeFilter, tag_ids_by_slug
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import CustomUser
+
+
+class RecipeFilterTests(APITestCase):
+    """Фильтры рецептов сужают один и тот же запрос"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='reader@test.ru', username='reader',
+            first_name='Reader', last_name='Test'
+        )
+        cls.author = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        (color_a, _), (color_b, _) = Tag.COLOR_CHOICES[:2]
+        cls.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast',
+                                           color=color_a)
+        cls.dinner = Tag.objects.create(name='Ужин', slug='dinner',
+                                        color=color_b)
+
+        def create(name, *tags):
+            recipe = Recipe.objects.create(author=cls.author, name=name,
+                                           text=name, cooking_time=5)
+            recipe.tags.set(tags)
+            return recipe
+
+        cls.porridge = create('Каша', cls.breakfast)
+        cls.omelette = create('Омлет', cls.breakfast, cls.dinner)
+        cls.steak = create('Стейк', cls.dinner)
+        Favorite.objects.create(user=cls.user, recipe=cls.omelette)
+        Favorite.objects.create(user=cls.user, recipe=cls.steak)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.porridge)
+        cls.url = reverse('recipes:recipes-list')
+
+    def ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_filters_compose(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(
+            self.ids({'is_favorited': 1, 'tags': 'breakfast'}),
+            {self.omelette.id}
+        )
+        self.assertEqual(self.ids({'is_favorited': 0}), {self.porridge.id})
+        self.assertEqual(
+            self.ids({'is_in_shopping_cart': 1, 'tags': 'dinner'}), set()
+        )
+
+    def test_tags_without_duplicates(self):
+        response = self.client.get(
+            self.url, {'tags': ['breakfast', 'dinner']}
+        )
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_unknown_tag(self):
+        response = self.client.get(self.url, {'tags': 'lunch'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tag_deleted_after_validation(self):
+        ids_by_slug = tag_ids_by_slug()
+        with mock.patch('recipes.filters.tag_ids_by_slug', side_effect=[
+            ids_by_slug, {'dinner': self.dinner.id}
+        ]):
+            response = self.client.get(self.url, {'tags': 'breakfast'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_anonymous(self):
+        self.assertEqual(self.ids({'is_favorited': 1}), set())
+        self.assertEqual(len(self.ids({'is_in_shopping_cart': 0})), 3)
+
+    def assert_uses_index(self, params, index):
+        request = APIRequestFactory().get(self.url, params)
+        request.user = self.user
+        plan = RecipeFilter(
+            request.GET, Recipe.objects.all(), request=request
+        ).qs.explain()
+        if connection.vendor == 'sqlite':
+            # SQLite называет индексы табличных UNIQUE сам
+            self.assertRegex(
+                plan, r'USING (COVERING )?INDEX \S+ '
+                      r'\(user_id=\? AND recipe_id=\?\)'
+            )
+        else:
+            self.assertIn(index, plan)
+
+    def test_user_lists_use_index(self):
+        self.assert_uses_index({'is_favorited': 1}, 'unique_favorites')
+        self.assert_uses_index({'is_in_shopping_cart': 1},
+                               'unique_shopping_cart')
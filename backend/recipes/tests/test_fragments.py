@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Tag)
+from users.models import CustomUser
+
+
+class RecipeFragmentTests(APITestCase):
+    """Закэшированные представления рецептов меняются вместе с рецептом,
+    его тегами, ингредиентами и автором, а флаги - у каждого свои"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name='User', last_name='Test'
+            ) for name in ('author', 'reader')
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast',
+                                     color=Tag.COLOR_CHOICES[0][0])
+        cls.ingredient = Ingredient.objects.create(name='мука',
+                                                   measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Блины', text='Описание', cooking_time=5
+        )
+        cls.recipe.tags.set([cls.tag])
+        cls.recipe_ingredient = RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=100
+        )
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipe)
+        cls.url = reverse('recipes:recipes-detail', args=(cls.recipe.id,))
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self):
+        return self.client.get(self.url).data
+
+    def change(self, func):
+        """Изменение в транзакции: версии меняются после фиксации"""
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        return self.get()
+
+    def test_user_flags_not_cached(self):
+        self.assertFalse(self.get()['is_favorited'])
+        self.client.force_authenticate(user=self.reader)
+        with self.assertNumQueries(1):
+            self.assertTrue(self.get()['is_favorited'])
+        self.client.force_authenticate(user=self.author)
+        self.assertFalse(self.get()['is_favorited'])
+
+    def test_recipe_changed(self):
+        def rename():
+            self.recipe.name = 'Оладьи'
+            self.recipe.save()
+        self.assertEqual(self.change(rename)['name'], 'Оладьи')
+
+    def test_ingredients_changed(self):
+        def change_amount():
+            self.recipe_ingredient.amount = 200
+            self.recipe_ingredient.save()
+        self.assertEqual(
+            self.change(change_amount)['ingredients'][0]['amount'], 200)
+
+    def test_tags_changed(self):
+        other = Tag.objects.create(name='Обед', slug='lunch',
+                                   color=Tag.COLOR_CHOICES[1][0])
+        data = self.change(lambda: self.recipe.tags.add(other))
+        self.assertEqual(len(data['tags']), 2)
+        data = self.change(lambda: other.recipes.clear())
+        self.assertEqual(len(data['tags']), 1)
+
+        def rename():
+            self.tag.name = 'Ужин'
+            self.tag.save()
+        self.assertEqual(self.change(rename)['tags'][0]['name'], 'Ужин')
+
+    def test_author_changed(self):
+        def rename():
+            self.author.first_name = 'Автор'
+            self.author.save()
+        data = self.change(rename)
+        self.assertEqual(data['author']['first_name'], 'Автор')
+        response = self.client.get(reverse('recipes:recipes-list'))
+        self.assertEqual(
+            response.data['results'][0]['author']['first_name'], 'Автор')
@@ -0,0 +1,86 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, Tag
+from tasks.models import Task
+from tasks.queue import run_pending
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data(color='red', image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 900), color).save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTests(APITestCase):
+    """Загрузка изображений рецептов и создание уменьшенных копий"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch',
+                                     color=Tag.GREEN)
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.author)
+
+    def create(self, name, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('recipes:recipes-list'), {
+                'name': name, 'text': 'Описание', 'cooking_time': 5,
+                'tags': [self.tag.id], 'image': image,
+                'ingredients': [{'id': self.ingredient.id, 'amount': 1}],
+            }, format='json')
+        return response
+
+    def test_renditions_and_dedup(self):
+        image = image_data()
+        first = self.create('Первый', image)
+        self.assertEqual(first.status_code, 201)
+        second = self.create('Второй', image)
+        # Копии создаёт фоновая задача на каждую загрузку
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(run_pending(), 2)
+        first_recipe, second_recipe = Recipe.objects.order_by('id')
+        self.assertEqual(first_recipe.image.name, second_recipe.image.name)
+        self.assertEqual(set(second_recipe.renditions),
+                         {'card', 'detail', 'preview'})
+        preview = second_recipe.renditions['preview']['webp']
+        with default_storage.open(preview) as file, Image.open(file) as thumb:
+            self.assertEqual(thumb.format, 'WEBP')
+            self.assertLessEqual(max(thumb.size), 160)
+        response = self.client.get(
+            reverse('recipes:recipes-detail', args=(second_recipe.id,)))
+        self.assertTrue(
+            response.data['renditions']['card']['jpg'].endswith('.jpg'))
+        self.assertEqual(second.status_code, 201)
+
+    def test_invalid_image(self):
+        for image in ('data:image/png;base64,bm90IGFuIGltYWdl',
+                      'data:image/png;base64,@@@', 'plain text'):
+            with self.subTest(image=image):
+                response = self.create('Плохой', image)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('image', response.data)
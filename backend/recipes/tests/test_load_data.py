@@ -0,0 +1,60 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class LoadDataTests(TestCase):
+    """Загрузка ингредиентов командой load_data"""
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def load(self, *args):
+        call_command('load_data', *args, stdout=StringIO())
+
+    def test_csv_deduplicates(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        path = self.write(
+            'ingredients.csv',
+            'соль,г\nсахар,г\nсахар,г\nмолоко,мл\nбез единицы\n'
+        )
+        self.load('--path', path, '--batch-size', '2')
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['молоко', 'сахар', 'соль']
+        )
+
+    def test_json(self):
+        path = self.write('data.json', json.dumps([
+            {'name': 'мука', 'measurement_unit': 'г'},
+            {'name': 'мука', 'measurement_unit': 'кг'},
+        ]))
+        self.load('--path', path)
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_dry_run(self):
+        path = self.write('ingredients.csv', 'соль,г\n')
+        self.load('--path', path, '--dry-run')
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_default_data(self):
+        self.load()
+        self.assertEqual(Ingredient.objects.count(), 2188)
+
+    def test_unknown_format(self):
+        path = self.write('ingredients.txt', 'соль,г\n')
+        with self.assertRaises(CommandError):
+            self.load('--path', path)
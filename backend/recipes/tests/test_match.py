@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.cache import get_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import CustomUser
+
+
+@override_settings(RECIPE_MATCH_INDEX_MAX_AGE=0)
+class RecipeMatchTests(APITestCase):
+    """Подбор рецептов по имеющимся ингредиентам"""
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        cls.egg, cls.milk, cls.flour, cls.salt = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('яйцо', 'молоко', 'мука', 'соль')
+        )
+
+        def create(name, *ingredients):
+            recipe = Recipe.objects.create(author=author, name=name,
+                                           text=name, cooking_time=5)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in ingredients
+            )
+            return recipe
+
+        cls.omelette = create('Омлет', cls.egg, cls.milk)
+        cls.pancakes = create('Блины', cls.egg, cls.milk, cls.flour)
+        cls.boiled = create('Варёное яйцо', cls.egg, cls.salt)
+        cls.bread = create('Хлеб', cls.flour, cls.salt)
+        cls.url = reverse('recipes:recipes-match')
+
+    def setUp(self):
+        cache.clear()
+
+    def match(self, *ingredients, **params):
+        have = ','.join(str(ingredient.id) for ingredient in ingredients)
+        return self.client.get(self.url, {'have': have, **params})
+
+    def test_ranked_by_matches(self):
+        response = self.match(self.egg, self.milk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        results = response.data['results']
+        self.assertEqual(
+            [recipe['id'] for recipe in results],
+            [self.omelette.id, self.pancakes.id, self.boiled.id]
+        )
+        self.assertEqual(results[0]['missing_ingredients'], [])
+        self.assertEqual(results[1]['matched_count'], 2)
+        self.assertEqual(
+            [ingredient['id'] for ingredient
+             in results[1]['missing_ingredients']],
+            [self.flour.id]
+        )
+        self.assertEqual(results[2]['missing_count'], 1)
+
+    def test_paginated(self):
+        response = self.match(self.egg, self.milk, limit=2, page=2)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.boiled.id]
+        )
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.bread, ingredient=self.milk, amount=1
+            )
+        response = self.match(self.milk)
+        self.assertEqual(response.data['count'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.omelette.delete()
+        response = self.match(self.milk)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_version_ignores_other_changes(self):
+        version = get_version('recipe_ingredients')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.omelette.name = 'Пышный омлет'
+            self.omelette.save()
+            row = RecipeIngredient.objects.get(recipe=self.omelette,
+                                               ingredient=self.egg)
+            row.amount = 3
+            row.save()
+        self.assertEqual(get_version('recipe_ingredients'), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            row.ingredient = self.salt
+            row.save()
+        self.assertNotEqual(get_version('recipe_ingredients'), version)
+
+    def test_invalid_have(self):
+        self.assertEqual(
+            self.client.get(self.url, {'have': 'egg'}).status_code, 400
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 400)
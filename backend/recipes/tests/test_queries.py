@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import (Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+
+class RecipeQueryCountTests(APITestCase):
+    """Число запросов к БД не зависит от размера страницы рецептов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='reader@test.ru', username='reader',
+            first_name='Reader', last_name='Test'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}', color=color)
+            for i, (color, _) in enumerate(Tag.COLOR_CHOICES[:2])
+        ]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(3)
+        )
+        for number in range(10):
+            author = CustomUser.objects.create(
+                email=f'author{number}@test.ru', username=f'author{number}',
+                first_name='Author', last_name='Test'
+            )
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+                Follow.objects.create(user=cls.user, author=author)
+        cls.recipe = recipe
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_list_queries(self, num):
+        url = reverse('recipes:recipes-list')
+        for limit in (1, 10):
+            with self.subTest(limit=limit), self.assertNumQueries(num):
+                response = self.client.get(url, {'limit': limit})
+            self.assertEqual(len(response.data['results']), limit)
+            # Теги и ингредиенты закэшированных рецептов не запрашиваются
+            with self.subTest(limit=limit), self.assertNumQueries(2):
+                self.assertEqual(
+                    self.client.get(url, {'limit': limit}).data,
+                    response.data
+                )
+        cache.clear()
+
+    def test_list_anonymous(self):
+        self.assert_list_queries(4)
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(user=self.user)
+        self.assert_list_queries(4)
+        response = self.client.get(reverse('recipes:recipes-list'))
+        flags = {
+            recipe['id']: (recipe['is_favorited'],
+                           recipe['is_in_shopping_cart'],
+                           recipe['author']['is_subscribed'])
+            for recipe in response.data['results']
+        }
+        self.assertEqual(flags[self.recipe.id], (True, True, True))
+        self.assertIn((False, False, False), flags.values())
+
+    def test_retrieve(self):
+        url = reverse('recipes:recipes-detail', args=(self.recipe.id,))
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertFalse(response.data['is_favorited'])
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['author']['is_subscribed'])
+        self.assertEqual(len(response.data['ingredients']), 3)
@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import CustomUser
+
+
+def encode(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class RecipeRankingTests(APITestCase):
+    """Сортировка рецептов по заранее посчитанным рейтингам"""
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            CustomUser.objects.create(
+                email=f'user{number}@test.ru', username=f'user{number}',
+                first_name='User', last_name='Test'
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=users[0], name=f'Рецепт {number}', text='Описание',
+                cooking_time=cooking_time
+            )
+            for number, cooking_time in enumerate((30, 10, 20, 10))
+        ]
+        first, second, third, _ = cls.recipes
+        for user in users[1:]:
+            Favorite.objects.create(user=user, recipe=first)
+        ShoppingCart.objects.create(user=users[1], recipe=second)
+        old = ShoppingCart.objects.create(user=users[2], recipe=third)
+        ShoppingCart.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(days=30))
+        call_command('refresh_rankings', stdout=StringIO())
+        cls.url = reverse('recipes:recipes-list')
+
+    def ordered_ids(self, ordering, **params):
+        response = self.client.get(
+            self.url, {'ordering': ordering, **params})
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def ids(self, *indexes):
+        return [self.recipes[index].id for index in indexes]
+
+    def test_popular(self):
+        self.assertEqual(self.ordered_ids('popular'), self.ids(0, 2, 1, 3))
+
+    def test_trending(self):
+        self.assertEqual(self.ordered_ids('trending'), self.ids(0, 1, 3, 2))
+
+    def test_quickest(self):
+        self.assertEqual(self.ordered_ids('quickest'), self.ids(1, 3, 2, 0))
+
+    def test_rankings_refreshed_incrementally(self):
+        Favorite.objects.all().delete()
+        call_command('refresh_rankings', stdout=StringIO())
+        self.assertEqual(self.ordered_ids('popular'), self.ids(2, 1, 3, 0))
+        self.assertEqual(self.ordered_ids('trending'), self.ids(1, 3, 2, 0))
+
+    def test_keyset_pages(self):
+        for ordering in ('popular', 'trending', 'quickest', None):
+            with self.subTest(ordering=ordering):
+                expected = self.ordered_ids(ordering or '')
+                params = {'cursor': '', 'limit': 1}
+                if ordering:
+                    params['ordering'] = ordering
+                url, ids = self.url, []
+                while url:
+                    response = self.client.get(url, params)
+                    ids += [item['id'] for item in response.data['results']]
+                    url, params = response.data['next'], {}
+                self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        cases = [
+            (None, 'broken'),
+            *((None, encode([value]))
+              for value in ('abc', None, [1], True, 10 ** 30)),
+            (None, base64.urlsafe_b64encode(b'[1e309]').decode()),
+            ('popular', encode(['x', 'y'])),
+        ]
+        for ordering, cursor in cases:
+            with self.subTest(ordering=ordering, cursor=cursor):
+                params = {'cursor': cursor}
+                if ordering:
+                    params['ordering'] = ordering
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 404)
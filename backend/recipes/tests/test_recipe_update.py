@@ -0,0 +1,79 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import CustomUser
+
+
+class RecipeUpdateTests(APITestCase):
+    """Редактирование рецепта меняет только изменившиеся строки"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', slug=f'tag{i}', color=color)
+            for i, (color, _) in enumerate(Tag.COLOR_CHOICES[:3])
+        ]
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(4)
+        )
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10
+        )
+        self.recipe.tags.set(self.tags[:2])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=self.recipe, ingredient=ingredient,
+                             amount=10)
+            for ingredient in self.ingredients[:3]
+        )
+        self.url = reverse('recipes:recipes-detail', args=(self.recipe.id,))
+        self.client.force_authenticate(user=self.author)
+
+    def patch(self, ingredients, tags):
+        return self.client.patch(self.url, {
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 15,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+        }, format='json')
+
+    def test_diff_update(self):
+        first, second, third, fourth = self.ingredients
+        kept = RecipeIngredient.objects.get(recipe=self.recipe,
+                                            ingredient=first)
+        response = self.patch(
+            [(first, 10), (second, 20), (fourth, 5)], self.tags[1:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(self.recipe.recipe_ingredient.values_list(
+                'ingredient_id', 'amount')),
+            {first.id: 10, second.id: 20, fourth.id: 5}
+        )
+        self.assertTrue(RecipeIngredient.objects.filter(
+            pk=kept.pk, amount=10).exists())
+        self.assertEqual(set(self.recipe.tags.all()), set(self.tags[1:]))
+        self.assertEqual(response.data['cooking_time'], 15)
+
+    def test_duplicate_ingredients(self):
+        first = self.ingredients[0]
+        response = self.patch([(first, 10), (first, 20)], self.tags)
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_tags(self):
+        response = self.patch([(self.ingredients[0], 10)],
+                              [self.tags[0], self.tags[0]])
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_ingredient(self):
+        missing = Ingredient(id=10 ** 6)
+        response = self.patch([(missing, 10)], self.tags)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,79 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.cache import content_key, get_version
+from recipes.filters import tag_ids_by_slug
+from recipes.models import Ingredient, Tag
+
+
+class ReferenceCacheTests(APITestCase):
+    """Кэширование справочников тегов и ингредиентов"""
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', slug='breakfast',
+                           color=Tag.ORANGE)
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_list(self):
+        url = reverse('recipes:ingredients-list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second.json()[0]['name'], 'соль')
+        self.assertIn('Last-Modified', second)
+
+    def test_not_modified(self):
+        url = reverse('recipes:tags-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_version_bumped_by_signals(self):
+        url = reverse('recipes:tags-list')
+        etag = self.client.get(url)['ETag']
+        Tag.objects.create(name='Обед', slug='lunch', color=Tag.GREEN)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_local_version_expires(self):
+        later = time.time() + 31
+        # Версию из общего кэша меняет только сигнал
+        with mock.patch('recipes.cache.is_process_local',
+                        return_value=False):
+            cache.clear()
+            version = get_version('tags')
+            with mock.patch('time.time', return_value=later):
+                self.assertEqual(get_version('tags'), version)
+        # Версия в кэше процесса устаревает, даже если её поменял другой
+        # процесс
+        cache.clear()
+        version = get_version('tags')
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(get_version('tags'), version)
+
+    @override_settings(REFERENCE_CACHE_TTL=60)
+    @mock.patch('recipes.cache.is_process_local', return_value=False)
+    def test_content_expires(self, is_process_local):
+        self.client.get(reverse('recipes:ingredients-list'))
+        tag_ids_by_slug()
+        keys = [
+            content_key('ingredients', get_version('ingredients')),
+            f"{content_key('tags', get_version('tags'))}:slugs",
+        ]
+        self.assertEqual(len(cache.get_many(keys)), 2)
+        # Список прежней версии не остаётся в кэше навсегда
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(cache.get_many(keys), {})
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from foodgram import routers
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+@mock.patch('foodgram.routers.replica_aliases', return_value=['replica1'])
+@mock.patch('foodgram.routers.pick_replica', return_value=None)
+class ReplicaRoutingTests(APITestCase):
+    """Чтение из реплик и закрепление за основной базой после записи"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name='User', last_name='Test'
+            ) for name in ('reader', 'other')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.other, name='Рецепт', text='Описание', cooking_time=5
+        )
+        cls.url = reverse('recipes:recipes-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_safe_actions_use_replica(self, pick_replica, aliases):
+        self.client.get(self.url)
+        self.client.get(reverse('recipes:recipes-detail',
+                                args=(self.recipe.id,)))
+        self.client.get(reverse('users:users-list'))
+        self.assertEqual(pick_replica.call_count, 3)
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse('users:users-me'))
+        self.assertEqual(pick_replica.call_count, 3)
+
+    def test_sticky_after_write(self, pick_replica, aliases):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse('recipes:recipes-favorite', args=(self.recipe.id,))
+        )
+        self.assertEqual(response.status_code, 201)
+        cookie = self.client.cookies[routers.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.client.get(self.url)
+        pick_replica.assert_not_called()
+        self.client.force_authenticate(user=self.other)
+        self.client.get(self.url)
+        pick_replica.assert_called_once()
+
+    def test_tampered_cookie(self, pick_replica, aliases):
+        self.client.force_authenticate(user=self.user)
+        self.client.cookies[routers.STICKY_COOKIE] = str(self.user.pk)
+        self.client.get(self.url)
+        pick_replica.assert_called_once()
+
+    def test_failed_write_is_not_sticky(self, pick_replica, aliases):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('recipes:recipes-favorite', args=(0,)))
+        self.client.get(self.url)
+        pick_replica.assert_called_once()
+
+    def test_without_replicas(self, pick_replica, aliases):
+        aliases.return_value = []
+        self.client.get(self.url)
+        pick_replica.assert_not_called()
+
+
+@override_settings(DB_REPLICA_RETRY_SECONDS=60)
+class PickReplicaTests(SimpleTestCase):
+    """Выбор реплики с проверкой соединения"""
+    def setUp(self):
+        routers._unhealthy.clear()
+        self.addCleanup(routers._unhealthy.clear)
+
+    def test_skips_unavailable(self):
+        broken, healthy = mock.Mock(), mock.Mock()
+        broken.ensure_connection.side_effect = OperationalError
+        databases = {'broken': broken, 'healthy': healthy}
+        # Без перемешивания сломанная реплика проверяется первой
+        with mock.patch.object(routers, 'connections', databases), \
+                mock.patch.object(routers, 'replica_aliases',
+                                  return_value=list(databases)), \
+                mock.patch.object(routers.random, 'shuffle'):
+            for _ in range(5):
+                self.assertEqual(routers.pick_replica(), 'healthy')
+            self.assertEqual(broken.ensure_connection.call_count, 1)
+            healthy.ensure_connection.side_effect = OperationalError
+            self.assertIsNone(routers.pick_replica())
+
+    def test_router(self):
+        router = routers.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'recipes'))
+        token = routers._route.set('replica1')
+        self.addCleanup(routers._route.reset, token)
+        with mock.patch.object(routers, 'connections') as connections:
+            connections.__getitem__.return_value.in_atomic_block = False
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+            connections.__getitem__.return_value.in_atomic_block = True
+            self.assertEqual(router.db_for_read(Recipe), 'default')
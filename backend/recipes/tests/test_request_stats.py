@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from foodgram.instrumentation import (QueryBudgetExceeded, RequestStats,
+                                      fingerprint)
+from recipes.models import Recipe
+from recipes.views import RecipeViewSet
+from users.models import CustomUser
+
+
+class RequestStatsTests(APITestCase):
+    """Учёт запросов к БД и бюджеты запросов представлений"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        for number in range(3):
+            Recipe.objects.create(author=cls.user, name=f'Рецепт {number}',
+                                  text='Описание', cooking_time=5)
+        cls.url = reverse('recipes:recipes-list')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing(self):
+        response = self.client.get(self.url)
+        stats = response.wsgi_request.stats
+        self.assertEqual(stats.queries, 4)
+        self.assertIn(f'desc="{stats.queries} queries"',
+                      response['Server-Timing'])
+        self.assertIn('render;dur=', response['Server-Timing'])
+        # Фрагменты рецептов ещё не в кэше и сериализуются
+        self.assertGreater(stats.serialize_time, 0)
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+    def test_structured_log(self):
+        with self.assertLogs('foodgram.requests', 'INFO') as logs:
+            self.client.get(self.url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'RecipeViewSet.list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['duplicates'], [])
+        self.assertIn('serialize_ms', record)
+
+    def test_duplicates(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT 1 WHERE id IN (%s)'),
+        )
+        stats = RequestStats()
+        with connection.execute_wrapper(stats):
+            for recipe in Recipe.objects.all():
+                CustomUser.objects.get(pk=recipe.author_id)
+        self.assertEqual(stats.queries, 4)
+        self.assertEqual(list(stats.duplicates.values()), [3])
+
+    def test_nested_serialization(self):
+        stats = RequestStats()
+        with mock.patch('foodgram.instrumentation.time.perf_counter',
+                        side_effect=[1.0, 5.0]):
+            with stats.serializing(), stats.serializing():
+                pass
+        self.assertEqual(stats.serialize_time, 4.0)
+
+    def test_budget_exceeded(self):
+        with mock.patch.dict(RecipeViewSet.query_budgets, {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url)
+            with override_settings(QUERY_BUDGETS_ENFORCE=False), \
+                    self.assertLogs('foodgram.requests', 'WARNING') as logs:
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        # Второй запрос берёт рецепты из кэша фрагментов
+        self.assertIn('RecipeViewSet.list: 2 queries, budget is 1',
+                      logs.output[-1])
+
+    def test_user_budgets_with_token(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for url in (reverse('users:users-list'),
+                    reverse('users:users-detail', args=(self.user.id,)),
+                    reverse('users:users-me')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,56 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import CustomUser
+
+
+class RecipeSearchTests(APITestCase):
+    """Полнотекстовый поиск рецептов"""
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create(
+            email='author@test.ru', username='author',
+            first_name='Author', last_name='Test'
+        )
+        cls.beet = Ingredient.objects.create(name='свёкла',
+                                             measurement_unit='г')
+
+        def create(name, text):
+            return Recipe.objects.create(author=author, name=name,
+                                         text=text, cooking_time=5)
+
+        cls.borsch = create('Борщ', 'Наваристый суп')
+        cls.soup = create('Суп дня', 'Похож на борщ, но без мяса')
+        cls.salad = create('Винегрет', 'Салат')
+        RecipeIngredient.objects.create(recipe=cls.salad,
+                                        ingredient=cls.beet, amount=100)
+        cls.url = reverse('recipes:recipes-list')
+
+    def search(self, query):
+        response = self.client.get(self.url, {'search': query})
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_ranked_by_field(self):
+        self.assertEqual(self.search('борщ'),
+                         [self.borsch.id, self.soup.id])
+
+    def test_ingredient_names(self):
+        self.assertEqual(self.search('свекла'), [self.salad.id])
+
+    def test_index_follows_writes(self):
+        self.salad.name = 'Винегрет с борщом'
+        self.salad.save()
+        self.assertIn(self.salad.id, self.search('борщ'))
+        RecipeIngredient.objects.filter(recipe=self.salad).delete()
+        self.assertEqual(self.search('свекла'), [])
+        self.beet.name = 'буряк'
+        self.beet.save()
+        RecipeIngredient.objects.create(recipe=self.soup,
+                                        ingredient=self.beet, amount=1)
+        self.assertEqual(self.search('буряк'), [self.soup.id])
+        self.soup.delete()
+        self.assertEqual(self.search('буряк'), [])
+
+    def test_no_words(self):
+        self.assertEqual(self.search('!!!'), [])
@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import CustomUser, Follow
+
+
+class SeedDataTests(TestCase):
+    """Заполнение базы командой seed_data"""
+    def seed(self, *args):
+        call_command('seed_data', '--users', '5', '--recipes', '20',
+                     '--ingredients', '30', '--favorites', '3',
+                     '--carts', '2', '--follows', '2', *args,
+                     stdout=StringIO())
+
+    def test_seed(self):
+        self.seed()
+        self.assertEqual(CustomUser.objects.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 20)
+        self.assertEqual(Ingredient.objects.count(), 30)
+        self.assertEqual(Favorite.objects.count(), 15)
+        self.assertEqual(ShoppingCart.objects.count(), 10)
+        self.assertEqual(Follow.objects.count(), 10)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertFalse(
+            Recipe.objects.annotate(tags_total=Count('tags'))
+            .filter(tags_total=0).exists()
+        )
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        self.assertEqual(recipe.favorites_count, recipe.favorites.count())
+
+    def test_reproducible(self):
+        self.seed('--prefix', 'first')
+        first = list(Recipe.objects.order_by('id').values_list(
+            'cooking_time', flat=True))
+        self.seed('--prefix', 'second')
+        second = list(Recipe.objects.order_by('id').values_list(
+            'cooking_time', flat=True))[20:]
+        self.assertEqual(first, second)
+
+    def test_prefix_taken(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
@@ -0,0 +1,226 @@
+import csv
+import io
+import json
+from unittest import mock
+
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import CustomUser
+
+
+class DownloadShoppingCartTests(APITestCase):
+    """Выгрузка списка покупок в разных форматах"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='buyer@test.ru', username='buyer',
+            first_name='Buyer', last_name='Test'
+        )
+        sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+        milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+        for amount in (100, 50):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {amount}',
+                text='Описание', cooking_time=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=sugar, amount=amount)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=milk, amount=amount * 2)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.url = reverse('recipes:recipes-download-shopping-cart')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode(), response
+
+    def test_text(self):
+        content, response = self.download()
+        self.assertEqual(content, 'молоко 300 - мл\r\nсахар 150 - г\r\n')
+        self.assertIn('shopping_list.txt', response['Content-Disposition'])
+
+    def test_csv(self):
+        content, _ = self.download(format='csv')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1:], [['молоко', 'мл', '300'],
+                                    ['сахар', 'г', '150']])
+
+    def test_json(self):
+        content, _ = self.download(format='json')
+        self.assertEqual(json.loads(content), [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 300},
+            {'name': 'сахар', 'measurement_unit': 'г', 'amount': 150},
+        ])
+
+    def test_empty_cart(self):
+        ShoppingCart.objects.all().delete()
+        content, _ = self.download(format='json')
+        self.assertEqual(json.loads(content), [])
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'format': 'doc'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+
+class ShoppingListMaintenanceTests(APITestCase):
+    """Таблица списка покупок совпадает с суммой по корзине после
+    любых изменений корзины и рецептов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name='User', last_name='Test'
+            ) for name in ('buyer', 'other')
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        )
+        cls.tag = Tag.objects.create(name='Тег', slug='tag',
+                                     color=Tag.COLOR_CHOICES[0][0])
+
+    def setUp(self):
+        self.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'Рецепт {number}',
+                text='Описание', cooking_time=5
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=10 * (number + 1))
+                for ingredient in self.ingredients[number:number + 2]
+            )
+            self.recipes.append(recipe)
+        self.client.force_authenticate(user=self.user)
+
+    def assertMaintained(self):
+        expected = {
+            (row['recipe__shopping_cart__user'], row['ingredient']):
+                row['total']
+            for row in RecipeIngredient.objects.filter(
+                recipe__shopping_cart__isnull=False
+            ).values('recipe__shopping_cart__user', 'ingredient').annotate(
+                total=Sum('amount'))
+        }
+        actual = {
+            (item.user_id, item.ingredient_id): item.amount
+            for item in ShoppingListItem.objects.all()
+        }
+        self.assertEqual(actual, expected)
+
+    def cart(self, method, recipe):
+        url = reverse('recipes:recipes-shopping-cart', args=(recipe.id,))
+        response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 300)
+        self.assertMaintained()
+
+    def test_cart_changes(self):
+        for recipe in self.recipes:
+            self.cart('post', recipe)
+        ShoppingCart.objects.create(user=self.other, recipe=self.recipes[1])
+        self.assertMaintained()
+        self.cart('delete', self.recipes[0])
+        self.cart('delete', self.recipes[1])
+
+    def test_recipe_changes(self):
+        for recipe in self.recipes[:2]:
+            self.cart('post', recipe)
+        ShoppingCart.objects.create(user=self.other, recipe=self.recipes[0])
+        first, second, third, fourth = self.ingredients
+        response = self.client.patch(
+            reverse('recipes:recipes-detail', args=(self.recipes[0].id,)),
+            {'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+             'tags': [self.tag.id],
+             'ingredients': [{'id': second.id, 'amount': 7},
+                             {'id': fourth.id, 'amount': 3}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertMaintained()
+        row = RecipeIngredient.objects.get(recipe=self.recipes[1],
+                                           ingredient=third)
+        row.ingredient = first
+        row.save()
+        self.assertMaintained()
+        self.recipes[1].delete()
+        self.assertMaintained()
+        self.user.delete()
+        self.assertMaintained()
+
+    def test_failed_recipe_delete(self):
+        self.cart('post', self.recipes[0])
+        # Удаление падает между pre_delete и post_delete и откатывается
+        with mock.patch('django.db.models.sql.subqueries.DeleteQuery.'
+                        'delete_batch', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                self.recipes[0].delete()
+        self.assertTrue(Recipe.objects.filter(pk=self.recipes[0].pk).exists())
+        # Отметка удаления не мешает следующим изменениям рецепта
+        ShoppingCart.objects.create(user=self.other, recipe=self.recipes[0])
+        self.assertMaintained()
+        row = RecipeIngredient.objects.filter(recipe=self.recipes[0]).first()
+        row.amount = 5
+        row.save()
+        self.assertMaintained()
+
+    def test_json_endpoint(self):
+        self.cart('post', self.recipes[0])
+        self.cart('post', self.recipes[1])
+        response = self.client.get(reverse('recipes:recipes-shopping-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': ingredient.id, 'name': ingredient.name,
+             'measurement_unit': 'г', 'amount': amount}
+            for ingredient, amount in zip(self.ingredients[:3],
+                                          (10, 30, 20))
+        ])
+
+    def test_rebuild(self):
+        self.cart('post', self.recipes[0])
+        ShoppingListItem.objects.update(amount=1)
+        rebuild_shopping_lists()
+        self.assertMaintained()
+
+
+class FailedDeleteTests(TransactionTestCase):
+    """Отметка удаления не переживает откат всей транзакции"""
+    def test_outer_rollback(self):
+        user = CustomUser.objects.create(
+            email='buyer@test.ru', username='buyer',
+            first_name='Buyer', last_name='Test'
+        )
+        recipe = Recipe.objects.create(author=user, name='Рецепт',
+                                       text='Описание', cooking_time=5)
+        row = RecipeIngredient.objects.create(
+            recipe=recipe, amount=1,
+            ingredient=Ingredient.objects.create(name='соль',
+                                                 measurement_unit='г')
+        )
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        with mock.patch('django.db.models.sql.subqueries.DeleteQuery.'
+                        'delete_batch', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                recipe.delete()
+        with transaction.atomic():
+            row.amount = 5
+            row.save()
+        self.assertEqual(ShoppingListItem.objects.get().amount, 5)
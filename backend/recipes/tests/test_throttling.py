@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from foodgram.throttling import blocked, take_token
+from recipes.models import Ingredient
+from recipes.tests.test_async_views import fetch
+from users.models import CustomUser
+
+RATES = {'search': '3/min', 'write': '2/min', 'export': '1/min'}
+REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                  'DEFAULT_THROTTLE_RATES': RATES}
+
+
+class TokenBucketTests(TestCase):
+    """Ведро отдаёт ёмкость сразу и наполняется со скоростью частоты"""
+    def setUp(self):
+        cache.clear()
+
+    def take(self, now):
+        with mock.patch('foodgram.throttling.time.time', return_value=now):
+            return take_token('test', 2, 60)
+
+    def test_refill(self):
+        self.assertEqual(self.take(600), 0)
+        self.assertEqual(self.take(601), 0)
+        self.assertAlmostEqual(self.take(602), 30)
+        # Отклонённый запрос не тратит токен
+        self.assertAlmostEqual(self.take(602), 30)
+        # Через половину следующего окна вернулся один токен из двух
+        self.assertEqual(self.take(690), 0)
+        self.assertGreater(self.take(690), 0)
+        self.assertEqual(self.take(780), 0)
+
+
+@override_settings(THROTTLE_ENABLED=True, REST_FRAMEWORK=REST_FRAMEWORK)
+class ThrottlingTests(APITestCase):
+    """Действия search, write и export ограничиваются по пользователю или
+    IP и отвечают 429 с Retry-After"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            CustomUser.objects.create(
+                email=f'{name}@test.ru', username=name,
+                first_name='User', last_name='Test'
+            ) for name in ('user', 'other')
+        )
+        Ingredient.objects.create(name='мука', measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        blocked.clear()
+
+    def assertThrottled(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_search(self):
+        url = '/api/ingredients/?name=му'
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertThrottled(self.client.get(url))
+        # Пользователь ограничивается отдельно от анонимов с его IP
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(ROOT_URLCONF='foodgram.asgi_urls',
+                       ASYNC_DB_CONCURRENCY=False)
+    def test_async_search(self):
+        url = '/api/ingredients/?name=му'
+        for _ in range(3):
+            self.assertEqual(fetch('get', url).status_code, 200)
+        self.assertThrottled(fetch('get', url))
+
+    def test_write_per_user(self):
+        url = '/api/users/subscribe/batch/'
+        data = {'ids': [self.other.id]}
+        self.client.force_authenticate(user=self.user)
+        for _ in range(2):
+            self.assertEqual(
+                self.client.post(url, data, format='json').status_code, 200)
+        self.assertThrottled(self.client.post(url, data, format='json'))
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(
+            self.client.post(url, data, format='json').status_code, 200)
+
+    def test_unscoped_and_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/recipes/').status_code,
+                             200)
+        with override_settings(THROTTLE_ENABLED=False):
+            for _ in range(5):
+                self.assertEqual(
+                    self.client.get('/api/ingredients/').status_code, 200)
@@ -8,8 +8,11 @@ def double_checker(item_list):
             raise exceptions.ValidationError(
                 f'{item} должен иметь хотя бы одну позицию!'
             )
+        seen = set()
         for element in item:
-            if item.count(element) > 1:
+            key = element['id'] if isinstance(element, dict) else element
+            if key in seen:
                 raise exceptions.ValidationError(
-                    f'{element} уже есть в рецепте!'
+                    f'{key} уже есть в рецепте!'
                 )
+            seen.add(key)
@@ -1,52 +1,139 @@
-from django.db.models import Sum
-from django.http.response import HttpResponse
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http.response import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from rest_framework import exceptions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from foodgram.instrumentation import serialization
 from foodgram.pagination import LimitPageNumberPaginator
-from .filters import IngredientSearchFilter, RecipeFilter
-from .models import (Favorite, Ingredient, Recipe,
-                     RecipeIngredient, ShoppingCart, Tag)
+from foodgram.routers import ReplicaReadMixin
+from tasks.queue import enqueue
+from tasks.views import accepted
+from .autocomplete import ingredient_index
+from .batch import add_batch
+from .feed import feed_recipe_ids
+from .matching import recipe_match_index
+from .filters import (IngredientSearchFilter, RecipeFilter,
+                      RecipeOrderingFilter, RecipeSearchFilter)
+from .fragments import RecipeFragments
+from .jobs import export_shopping_list
+from .mixins import CachedListMixin
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem, Tag)
 from .permissions import AdminOrReadOnly, AuthorOrReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS
 from .serializers import (
-    FavoriteSerializer, IngredientSerializer, RecipeCreateSerializer,
-    RecipeGetSerializer, ShoppingCartSerializer, TagSerializer)
+    BatchSerializer, FavoriteSerializer, IngredientSerializer,
+    RecipeCreateSerializer, RecipeGetSerializer, RecipeMatchSerializer,
+    ShoppingCartSerializer, ShoppingListExportSerializer,
+    ShoppingListItemSerializer, TagSerializer)
+from .shopping_list import cart_changed
+
+SHOPPING_LIST_CHUNK_SIZE = 2000
+MATCH_MAX_INGREDIENTS = 100
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, CachedListMixin,
+                 viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     permission_classes = (AdminOrReadOnly,)
     pagination_class = None
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CachedListMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     pagination_class = None
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientSearchFilter
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    throttle_scopes = {'list': 'search'}
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and settings.INGREDIENT_SEARCH_IN_MEMORY:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (AuthorOrReadOnly,)
     serializer_class = RecipeGetSerializer
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter,
+                       RecipeOrderingFilter)
     filterset_class = RecipeFilter
     pagination_class = LimitPageNumberPaginator
+    replica_actions = ('list', 'retrieve', 'match')
+    query_budgets = {
+        'list': 6,
+        'retrieve': 4,
+        'match': 4,
+        # Включая раскладку в ленты подписчиков одной пачкой
+        'create': 18,
+        'update': 25,
+        'partial_update': 25,
+        'favorite': 7,
+        'shopping_cart': 10,
+        'download_shopping_cart': 2,
+        'shopping_list': 2,
+        'feed': 6,
+        'favorite_batch': 6,
+        'shopping_cart_batch': 9,
+        'export_shopping_list': 2,
+    }
+    throttle_scopes = {
+        'match': 'search',
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'destroy': 'write',
+        'favorite': 'write',
+        'shopping_cart': 'write',
+        'favorite_batch': 'write',
+        'shopping_cart_batch': 'write',
+        'download_shopping_cart': 'export',
+        'export_shopping_list': 'export',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.with_user_flags(
+                self.request.user).select_related('author')
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
+    def render_recipes(self, recipes):
+        """Данные рецептов из кэша фрагментов, сериализуются только
+        промахи"""
+        return RecipeFragments(recipes, self.request).render(
+            self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.render_recipes(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.render_recipes([self.get_object()])[0])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -103,29 +190,164 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 ShoppingCart, user, recipe)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def add_batch(self, request, model):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        with transaction.atomic():
+            created, results = add_batch(
+                model, 'recipe', user, Recipe.objects.all(),
+                serializer.validated_data['ids']
+            )
+            if model is ShoppingCart and created:
+                cart_changed(user.id, created)
+        return Response({'results': results})
+
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            url_path='favorite/batch',
+            url_name='favorite-batch'
+            )
+    def favorite_batch(self, request):
+        return self.add_batch(request, Favorite)
+
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            url_path='shopping_cart/batch',
+            url_name='shopping-cart-batch'
+            )
+    def shopping_cart_batch(self, request):
+        return self.add_batch(request, ShoppingCart)
+
     @action(methods=['GET'],
             detail=False,
-            permission_classes=(IsAuthenticated,)
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=SHOPPING_LIST_RENDERERS
             )
     def download_shopping_cart(self, request):
-        file_name = 'shopping_list.txt'
+        renderer = request.accepted_renderer
+        ingredients = self.get_shopping_list(request.user).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+        if isinstance(request._request, ASGIRequest):
+            # ASGIHandler перебирает потоковый ответ в цикле событий, где
+            # запросы к БД запрещены, поэтому строки читаются заранее; их
+            # не больше числа ингредиентов
+            rows = list(ingredients)
+        else:
+            rows = ingredients.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=shopping_list.{renderer.format}'
+        )
+        return response
+
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            url_path='shopping_list/export',
+            url_name='shopping-list-export'
+            )
+    def export_shopping_list(self, request):
+        serializer = ShoppingListExportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return accepted(request, enqueue(
+            export_shopping_list, request.user.id,
+            serializer.validated_data['format'], user=request.user
+        ))
+
+    @staticmethod
+    def get_shopping_list(user):
+        """Суммы ингредиентов корзины из заранее посчитанной таблицы"""
+        return ShoppingListItem.objects.filter(
+            user=user).order_by('ingredient__name')
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            filter_backends=()
+            )
+    def shopping_list(self, request):
+        items = self.get_shopping_list(request.user).select_related(
+            'ingredient')
+        serializer = ShoppingListItemSerializer(items, many=True)
+        with serialization():
+            return Response(serializer.data)
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(IsAuthenticated,),
+            filter_backends=()
+            )
+    def feed(self, request):
         user = request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_sum=Sum('amount')).values_list(
-            'ingredient__name', 'ingredient__measurement_unit',
-            'ingredient_sum')
-        content = ''
-        for ingredient in ingredients:
-            content += (
-                f'{ingredient[0]} '
-                f'{ingredient[2]} '
-                f'- {ingredient[1]}\r\n'
+        ids = self.paginator.paginate_keys(
+            lambda before, limit: feed_recipe_ids(user, before, limit),
+            request
+        )
+        recipes = Recipe.objects.with_user_flags(
+            user).select_related('author').in_bulk(ids)
+        return self.get_paginated_response(self.render_recipes(
+            [recipes[pk] for pk in ids if pk in recipes]
+        ))
+
+    @staticmethod
+    def parse_have(request):
+        value = request.query_params.get('have', '')
+        try:
+            ingredient_ids = {
+                int(item) for item in value.split(',') if item.strip()
+            }
+        except ValueError:
+            raise exceptions.ValidationError(
+                {'have': 'Ожидается список id ингредиентов через запятую.'}
+            )
+        if not ingredient_ids:
+            raise exceptions.ValidationError(
+                {'have': 'Укажите хотя бы один ингредиент.'}
             )
-        response = HttpResponse(
-            content, content_type='text/plain', charset='utf-8'
+        if len(ingredient_ids) > MATCH_MAX_INGREDIENTS:
+            raise exceptions.ValidationError(
+                {'have': f'Не больше {MATCH_MAX_INGREDIENTS} ингредиентов.'}
+            )
+        return ingredient_ids
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(AllowAny,),
+            filter_backends=()
+            )
+    def match(self, request):
+        have = self.parse_have(request)
+        page = self.paginate_queryset(recipe_match_index.match(have))
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
         )
-        response['Content-Disposition'] = f'attachment; filename={file_name}'
-        return response
+        missing = defaultdict(list)
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=recipes
+        ).exclude(ingredient_id__in=have).select_related(
+            'ingredient'
+        ).order_by('ingredient__name'):
+            missing[recipe_ingredient.recipe_id].append(
+                recipe_ingredient.ingredient
+            )
+        results = []
+        for recipe_id, matched, missing_count in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched_count = matched
+            recipe.missing_count = missing_count
+            recipe.missing_ingredients = missing[recipe_id]
+            results.append(recipe)
+        serializer = RecipeMatchSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        with serialization():
+            return self.get_paginated_response(serializer.data)
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'user', 'created',
+                    'finished')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'args', 'kwargs', 'attempts', 'result',
+                       'error', 'user', 'created', 'started', 'finished')
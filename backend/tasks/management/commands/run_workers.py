@@ -0,0 +1,96 @@
+import logging
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, connections
+
+from recipes.cache import is_process_local
+from tasks.queue import claim, execute, requeue_stale
+
+logger = logging.getLogger('tasks.queue')
+
+
+def work(threads, poll_interval, burst):
+    """Выполняет задачи в threads потоках до SIGTERM/SIGINT, а с burst -
+    пока очередь не опустеет"""
+    stop = threading.Event()
+
+    def loop():
+        try:
+            while not stop.is_set():
+                try:
+                    task = claim()
+                    if task is None and not burst:
+                        requeue_stale()
+                except DatabaseError:
+                    logger.exception('Не удалось получить задачу')
+                    connection.close()
+                    stop.wait(poll_interval)
+                    continue
+                if task is not None:
+                    execute(task)
+                    continue
+                if burst:
+                    break
+                stop.wait(poll_interval)
+        finally:
+            connection.close()
+
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stop.set())
+    workers = [threading.Thread(target=loop, name=f'tasks-{number}')
+               for number in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class Command(BaseCommand):
+    help = 'Runs background task workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=settings.TASK_WORKER_PROCESSES,
+                            help='Процессов воркеров')
+        parser.add_argument('--threads', type=int,
+                            default=settings.TASK_WORKER_THREADS,
+                            help='Потоков в каждом процессе')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.TASK_POLL_INTERVAL,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--burst', action='store_true',
+                            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        if is_process_local():
+            self.stderr.write(self.style.WARNING(
+                'Кэш в памяти процесса: изменения из задач веб-воркеры '
+                'увидят только через LOCAL_CACHE_VERSION_TTL секунд. '
+                'Задайте общий CACHE_URL.'
+            ))
+        arguments = (options['threads'], options['poll_interval'],
+                     options['burst'])
+        if options['processes'] <= 1:
+            work(*arguments)
+            return
+        # Дочерние процессы открывают свои соединения с БД
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=work, args=arguments)
+                     for _ in range(options['processes'])]
+        for process in processes:
+            process.start()
+
+        def terminate(*args):
+            for process in processes:
+                process.terminate()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, terminate)
+        for process in processes:
+            process.join()
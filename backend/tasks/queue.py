@@ -0,0 +1,121 @@
+"""Очередь фоновых задач в таблице Task без внешнего брокера.
+
+Воркеры (manage.py run_workers) забирают готовые задачи запросом
+SELECT ... FOR UPDATE SKIP LOCKED, поэтому одну задачу выполняет один
+воркер, а остальные не ждут чужих блокировок. Упавшая задача
+перезапускается с экспоненциальной задержкой TASK_RETRY_DELAY * 2**n
+секунд, пока не кончатся попытки. Задача, которую воркер выполняет
+дольше TASK_LEASE_SECONDS, считается брошенной и снова ставится в
+очередь.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы и результат функции должны сериализоваться в JSON.
+    """
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return register if func is None else register(func)
+
+
+def enqueue(func, *args, user=None, run_at=None, **kwargs):
+    """Ставит вызов зарегистрированной функции в очередь; с run_at -
+    не раньше этого времени"""
+    return Task.objects.create(
+        name=func.task_name, args=list(args), kwargs=kwargs, user=user,
+        run_at=run_at or timezone.now(),
+        max_attempts=func.max_attempts or settings.TASK_MAX_ATTEMPTS
+    )
+
+
+def claim():
+    """Забирает самую раннюю готовую задачу, пропуская задачи,
+    заблокированные другими воркерами; None, если таких нет"""
+    now = timezone.now()
+    with transaction.atomic():
+        task = Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.QUEUED, run_at__lte=now
+        ).order_by('run_at', 'id').first()
+        if task is None:
+            return None
+        task.status = Task.RUNNING
+        task.attempts += 1
+        task.started = now
+        task.save(update_fields=('status', 'attempts', 'started'))
+    return task
+
+
+def execute(task):
+    """Выполняет забранную задачу и записывает результат или ошибку"""
+    changes = {}
+    try:
+        func = _registry.get(task.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача {task.name}')
+        changes['result'] = func(*task.args, **task.kwargs)
+    except Exception as error:
+        logger.exception('Задача %s #%s завершилась ошибкой',
+                         task.name, task.pk)
+        changes['error'] = f'{type(error).__name__}: {error}'
+        if task.attempts < task.max_attempts:
+            changes['status'] = Task.QUEUED
+            changes['run_at'] = timezone.now() + timedelta(
+                seconds=settings.TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+        else:
+            changes['status'] = Task.FAILED
+            changes['finished'] = timezone.now()
+    else:
+        changes.update(status=Task.DONE, error='', finished=timezone.now())
+    # Если задачу сочли брошенной и отдали другому воркеру, результат
+    # этой попытки не записывается
+    Task.objects.filter(
+        pk=task.pk, status=Task.RUNNING, attempts=task.attempts
+    ).update(**changes)
+    for field, value in changes.items():
+        setattr(task, field, value)
+    return task
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, которые не отчитались за
+    TASK_LEASE_SECONDS, или завершает их ошибкой, если попыток не
+    осталось"""
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    )
+    message = 'Воркер не завершил задачу'
+    stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Task.QUEUED, run_at=now, error=message)
+    stale.update(status=Task.FAILED, finished=now, error=message)
+
+
+def run_pending():
+    """Выполняет готовые задачи, пока они есть; возвращает их число"""
+    count = 0
+    task = claim()
+    while task is not None:
+        execute(task)
+        count += 1
+        task = claim()
+    return count
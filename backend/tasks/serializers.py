@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from .models import Task
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    """Сериализатор статуса фоновой задачи"""
+    class Meta:
+        model = Task
+        fields = ('id', 'name', 'status', 'attempts', 'result', 'error',
+                  'created', 'started', 'finished')
+        read_only_fields = fields
@@ -0,0 +1,170 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from tasks.models import Task
+from tasks.queue import (claim, enqueue, execute, requeue_stale,
+                         run_pending, task)
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+calls = []
+
+
+@task
+def add(a, b):
+    calls.append((a, b))
+    return a + b
+
+
+@task(max_attempts=2)
+def fail():
+    raise ValueError('сбой')
+
+
+class QueueTests(TestCase):
+    """Выполнение, повторы и возврат брошенных задач"""
+    def setUp(self):
+        calls.clear()
+
+    def test_run(self):
+        queued = enqueue(add, 2, b=3)
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.result, queued.attempts),
+                         (Task.DONE, 5, 1))
+        self.assertIsNotNone(queued.finished)
+        self.assertEqual(run_pending(), 0)
+
+    def test_delayed(self):
+        enqueue(add, 1, 1)
+        Task.objects.update(run_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim())
+
+    def run_failing(self):
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            run_pending()
+
+    @override_settings(TASK_RETRY_DELAY=60)
+    def test_retry_with_backoff(self):
+        queued = enqueue(fail)
+        self.run_failing()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(queued.error, 'ValueError: сбой')
+        self.assertGreater(queued.run_at,
+                           timezone.now() + timedelta(seconds=50))
+        Task.objects.update(run_at=timezone.now())
+        self.run_failing()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+
+    def test_unknown_task(self):
+        Task.objects.create(name='missing', max_attempts=1)
+        self.run_failing()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    @override_settings(TASK_LEASE_SECONDS=60)
+    def test_requeue_stale(self):
+        enqueue(add, 1, 2)
+        stale = claim()
+        Task.objects.update(started=timezone.now() - timedelta(minutes=2))
+        requeue_stale()
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+        # Результат брошенной попытки не записывается
+        execute(stale)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+        run_pending()
+        self.assertEqual(Task.objects.get().result, 3)
+
+
+class RunWorkersTests(TransactionTestCase):
+    """Команда run_workers выполняет очередь и с --burst завершается"""
+    def test_burst(self):
+        calls.clear()
+        for number in range(5):
+            enqueue(add, number, 1)
+        # SQLite блокирует таблицу целиком, поэтому поток один
+        call_command('run_workers', processes=1, threads=1, burst=True,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(sorted(calls), [(number, 1) for number in range(5)])
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TaskEndpointTests(APITestCase):
+    """Тяжёлые операции отвечают 202 и ссылкой на статус задачи"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            CustomUser.objects.create_user(
+                email=f'{name}@test.ru', username=name, password='password',
+                first_name='User', last_name='Test'
+            ) for name in ('user', 'other')
+        )
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Блины', text='Описание', cooking_time=5
+        )
+        RecipeIngredient.objects.create(recipe=cls.recipe,
+                                        ingredient=ingredient, amount=100)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipe)
+        cls.export_url = reverse('recipes:recipes-shopping-list-export')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_export_shopping_list(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.export_url, {'format': 'csv'},
+                                    format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Task.QUEUED)
+        url = response['Location']
+        run_pending()
+        response = self.client.get(url)
+        self.assertEqual(response.data['status'], Task.DONE)
+        self.assertTrue(response.data['result']['url'].endswith('.csv'))
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # Файл удаляется отложенной задачей
+        _, (name,) = default_storage.listdir('exports')
+        self.assertEqual(run_pending(), 0)
+        Task.objects.filter(status=Task.QUEUED).update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        self.assertFalse(default_storage.exists(f'exports/{name}'))
+
+    def test_invalid_export_format(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.export_url, {'format': 'pdf'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_user(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.delete(reverse('users:users-me'),
+                                      {'current_password': 'password'})
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(CustomUser.objects.get(pk=self.user.pk).is_blocked)
+        self.assertTrue(Recipe.objects.exists())
+        run_pending()
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(Task.objects.get().result, {'deleted_recipes': 1})
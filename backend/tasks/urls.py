@@ -0,0 +1,13 @@
+from django.urls import include, path
+from rest_framework import routers
+
+from .views import TaskViewSet
+
+router = routers.SimpleRouter()
+router.register(r'tasks', TaskViewSet, basename='tasks')
+
+app_name = 'tasks'
+
+urlpatterns = [
+    path('', include(router.urls))
+]
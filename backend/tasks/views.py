@@ -0,0 +1,30 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from .models import Task
+from .serializers import TaskSerializer
+
+
+def accepted(request, task):
+    """Ответ 202 на поставленную задачу со ссылкой на её статус"""
+    url = reverse('tasks:tasks-detail', args=(task.pk,), request=request)
+    return Response(TaskSerializer(task).data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': url})
+
+
+class TaskViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Статус и результат задач текущего пользователя"""
+    serializer_class = TaskSerializer
+    permission_classes = (IsAuthenticated,)
+    query_budgets = {
+        'retrieve': 2,
+    }
+
+    def get_queryset(self):
+        queryset = Task.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
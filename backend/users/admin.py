@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
 
+from .authentication import invalidate_user_tokens
 from .models import CustomUser, Follow
 
 
@@ -7,12 +9,13 @@ from .models import CustomUser, Follow
 class CustomUserAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'email', 'username', 'first_name', 'last_name', 'is_blocked',
-        'is_superuser',
+        'is_superuser', 'recipes_count', 'followers_count',
     )
     list_filter = (
         'email', 'username', 'is_blocked', 'is_superuser',
     )
     search_fields = ('email', 'username', 'first_name', 'last_name',)
+    actions = ('block', 'unblock')
     fieldsets = (
         (None, {'fields': (
             'email', 'username', 'first_name', 'last_name', 'password',
@@ -20,6 +23,19 @@ class CustomUserAdmin(admin.ModelAdmin):
         ('Permissions', {'fields': ('is_blocked', 'is_superuser',)})
     )
 
+    def set_blocked(self, queryset, value):
+        ids = list(queryset.values_list('id', flat=True))
+        queryset.filter(id__in=ids).update(is_blocked=value)
+        transaction.on_commit(lambda: invalidate_user_tokens(*ids))
+
+    @admin.action(description='Заблокировать выбранных пользователей')
+    def block(self, request, queryset):
+        self.set_blocked(queryset, True)
+
+    @admin.action(description='Разблокировать выбранных пользователей')
+    def unblock(self, request, queryset):
+        self.set_blocked(queryset, False)
+
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
@@ -0,0 +1,26 @@
+from foodgram.async_views import async_read, in_thread, paginate
+from foodgram.instrumentation import serialization
+from recipes.serializers import SubscriptionSerializer
+from .models import Follow
+from .views import CustomUserViewSet
+
+
+async def list_subscriptions(view, request):
+    """Страница подписок: строки и число подписок одновременно, затем
+    превью рецептов авторов страницы"""
+    queryset = Follow.objects.filter(
+        user=request.user).with_author_stats().order_by('-id')
+
+    def serialize(follows):
+        serializer = SubscriptionSerializer(
+            follows, many=True,
+            context=view.get_subscription_context(follows)
+        )
+        with serialization():
+            return serializer.data
+
+    return await paginate(view, request, queryset, in_thread(serialize))
+
+
+subscriptions = async_read(CustomUserViewSet, 'subscriptions',
+                           list_subscriptions)
@@ -0,0 +1,96 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from recipes.cache import bump_version, get_version, is_process_local
+
+BLOCKED_MESSAGE = 'Данный пользователь заблокирован!'
+
+
+def token_key(key):
+    return f'auth:token:{key}'
+
+
+class TokenCache:
+    """Снимки пользователей по ключу токена.
+
+    Первый уровень - LRU в памяти процесса на AUTH_TOKEN_CACHE_SIZE
+    записей, второй - общий кэш Django. Записи живут
+    AUTH_TOKEN_CACHE_TTL секунд. При выходе, смене пароля или блокировке
+    пользователя запись удаляется из общего кэша, а версия auth_tokens
+    меняется, и процессы сбрасывают свои LRU. Если кэш Django сам живёт
+    в памяти процесса, LRU не используется: он ничего не ускоряет.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    def get(self, key):
+        if is_process_local():
+            return cache.get(token_key(key))
+        version = get_version('auth_tokens')
+        now = time.monotonic()
+        with self._lock:
+            if self._version != version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+        snapshot = cache.get(token_key(key))
+        if snapshot is not None:
+            self._remember(key, snapshot, version)
+        return snapshot
+
+    def set(self, key, snapshot):
+        cache.set(token_key(key), snapshot, settings.AUTH_TOKEN_CACHE_TTL)
+        if not is_process_local():
+            self._remember(key, snapshot, get_version('auth_tokens'))
+
+    def _remember(self, key, snapshot, version):
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            if self._version != version:
+                return
+            self._entries[key] = (snapshot, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        cache.delete_many([token_key(key) for key in keys])
+        bump_version('auth_tokens')
+
+
+token_cache = TokenCache()
+
+
+def invalidate_user_tokens(*user_ids):
+    """Сбрасывает снимки всех токенов пользователей"""
+    keys = Token.objects.filter(user__in=user_ids).values_list(
+        'key', flat=True)
+    token_cache.invalidate(*keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая берёт токен и пользователя из
+    TokenCache и не пускает заблокированных пользователей"""
+    def authenticate_credentials(self, key):
+        snapshot = token_cache.get(key)
+        if snapshot is None:
+            snapshot = super().authenticate_credentials(key)
+            token_cache.set(key, snapshot)
+        # Каждый запрос получает свою копию пользователя из снимка
+        user, token = copy.copy(snapshot[0]), snapshot[1]
+        if user.is_blocked:
+            raise exceptions.AuthenticationFailed(BLOCKED_MESSAGE)
+        return user, token
@@ -0,0 +1,24 @@
+from django.db import transaction
+
+from recipes.models import Recipe
+from tasks.queue import task
+from .models import CustomUser
+
+DELETE_BATCH_SIZE = 100
+
+
+@task
+def delete_user(user_id):
+    """Удаляет рецепты пользователя пачками по DELETE_BATCH_SIZE в
+    отдельных транзакциях, затем самого пользователя"""
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(Recipe.objects.filter(author=user_id).values_list(
+                'id', flat=True)[:DELETE_BATCH_SIZE])
+            if not ids:
+                break
+            Recipe.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+    CustomUser.objects.filter(pk=user_id).delete()
+    return {'deleted_recipes': deleted}
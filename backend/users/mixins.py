@@ -4,6 +4,8 @@ from .models import Follow
 class SubscribeMixin:
     """Миксин подписки"""
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.db.models import Value
 
 from .manager import CustomUserManager
 
@@ -22,6 +23,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     last_name = models.CharField('Фамилия', max_length=150, blank=False)
     is_superuser = models.BooleanField('Администратор', default=False)
     is_blocked = models.BooleanField('Блокировка', default=False)
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -45,6 +52,14 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         return self.is_blocked
 
 
+class FollowQuerySet(models.QuerySet):
+    def with_author_stats(self):
+        """Подгружает авторов подписок и аннотирует флаг подписки"""
+        return self.select_related('author').annotate(
+            is_subscribed=Value(True),
+        )
+
+
 class Follow(models.Model):
     author = models.ForeignKey(
         CustomUser,
@@ -61,6 +76,8 @@ class Follow(models.Model):
         null=True
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
         constraints = [
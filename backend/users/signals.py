@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_user_tokens, token_cache
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(instance, created, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    transaction.on_commit(lambda: invalidate_user_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    # После удаления Django обнуляет первичный ключ, то есть key
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.invalidate(key))
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from users.authentication import BLOCKED_MESSAGE, token_cache
+from users.models import CustomUser
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Пользователь по токену берётся из кэша, кэш сбрасывается при
+    выходе, смене пароля и блокировке"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='user@test.ru', username='user', password='old-password',
+            first_name='User', last_name='Test'
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@test.ru', username='admin', password='admin',
+            first_name='Admin', last_name='Test'
+        )
+        cls.url = reverse('users:users-me')
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_query_cached(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Остаётся только запрос флага подписки на себя
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_process_lru(self):
+        token_cache.invalidate()
+        self.client.get(self.url)
+        # Кэш в памяти процесса не дублируется в LRU
+        self.assertNotIn(self.token.key, token_cache._entries)
+        with mock.patch('users.authentication.is_process_local',
+                        return_value=False):
+            self.client.get(self.url)
+            self.assertIn(self.token.key, token_cache._entries)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('users:logout'))
+            self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_logout(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('users:logout'))
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_password_change(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('users:users-set-password'),
+                {'current_password': 'old-password',
+                 'new_password': 'new-Password-123'}
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_blocked_in_admin(self):
+        self.client.get(self.url)
+        admin = self.client_class()
+        admin.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.post(
+                reverse('admin:users_customuser_changelist'),
+                {'action': 'block', '_selected_action': [self.user.pk]}
+            )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], BLOCKED_MESSAGE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.post(
+                reverse('admin:users_customuser_change',
+                        args=(self.user.pk,)),
+                {'email': self.user.email, 'username': self.user.username,
+                 'first_name': 'User', 'last_name': 'Test',
+                 'password': self.user.password, 'is_blocked': ''}
+            )
+        self.assertEqual(self.client.get(self.url).status_code, 200)
@@ -0,0 +1,73 @@
+import base64
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from foodgram.pagination import LimitPageNumberPaginator
+from users.models import CustomUser, Follow
+
+
+class PaginationTests(APITestCase):
+    """Постраничный и ключевой режимы пагинации"""
+    @classmethod
+    def setUpTestData(cls):
+        CustomUser.objects.bulk_create(
+            CustomUser(email=f'user{number}@test.ru',
+                       username=f'user{number}',
+                       first_name='User', last_name='Test')
+            for number in range(7)
+        )
+        cls.user = CustomUser.objects.first()
+        cls.user.is_superuser = True
+        cls.user.save()
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author)
+            for author in CustomUser.objects.exclude(pk=cls.user.pk)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url, **params):
+        ids = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            url, params = response.data['next'], {}
+        return ids
+
+    def test_page_number_shape(self):
+        response = self.client.get(reverse('users:users-list'), {'limit': 2})
+        self.assertEqual(
+            list(response.data), ['count', 'next', 'previous', 'results'])
+        self.assertEqual(response.data['count'], 7)
+
+    @mock.patch.object(LimitPageNumberPaginator, 'max_page_size', 3)
+    def test_max_page_size(self):
+        for params in ({'limit': 100000}, {'limit': 100000, 'cursor': ''}):
+            response = self.client.get(reverse('users:users-list'), params)
+            self.assertEqual(len(response.data['results']), 3)
+
+    def test_cursor_users(self):
+        ids = self.walk(reverse('users:users-list'), cursor='', limit=3)
+        self.assertEqual(
+            ids, list(CustomUser.objects.values_list('id', flat=True)))
+
+    def test_cursor_subscriptions(self):
+        ids = self.walk(
+            reverse('users:users-subscriptions'), cursor='', limit=4)
+        self.assertEqual(
+            ids,
+            list(Follow.objects.values_list('author_id', flat=True))
+        )
+
+    def test_invalid_cursor(self):
+        for position in (b'["abc"]', b'[null]', b'[[1]]', b'[1e309]'):
+            with self.subTest(position=position):
+                response = self.client.get(
+                    reverse('users:users-list'),
+                    {'cursor': base64.urlsafe_b64encode(position).decode()}
+                )
+                self.assertEqual(response.status_code, 404)
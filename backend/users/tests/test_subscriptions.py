@@ -0,0 +1,67 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from users.models import CustomUser, Follow
+
+
+class SubscriptionsTests(APITestCase):
+    """Страница подписок собирается фиксированным числом запросов"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(
+            email='reader@test.ru', username='reader',
+            first_name='Reader', last_name='Test'
+        )
+        for number in range(6):
+            author = CustomUser.objects.create(
+                email=f'author{number}@test.ru', username=f'author{number}',
+                first_name='Author', last_name='Test'
+            )
+            for index in range(number):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {number}-{index}',
+                    text='Описание', cooking_time=5
+                )
+            Follow.objects.create(user=cls.user, author=author)
+        cls.url = reverse('users:users-subscriptions')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_query_count(self):
+        for limit in (1, 6):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                response = self.client.get(
+                    self.url, {'limit': limit, 'recipes_limit': 2})
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipes_preview(self):
+        response = self.client.get(self.url, {'recipes_limit': 2})
+        for author in response.data['results']:
+            author_recipes = Recipe.objects.filter(author_id=author['id'])
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], author_recipes.count())
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']],
+                list(author_recipes.values_list('id', flat=True)[:2])
+            )
+
+    def test_recipes_without_limit(self):
+        response = self.client.get(self.url)
+        for author in response.data['results']:
+            self.assertEqual(len(author['recipes']), author['recipes_count'])
+
+    def test_subscribe(self):
+        author = CustomUser.objects.create(
+            email='new@test.ru', username='new',
+            first_name='Author', last_name='Test'
+        )
+        Recipe.objects.create(author=author, name='Новый рецепт',
+                              text='Описание', cooking_time=5)
+        url = reverse('users:users-subscribe', args=(author.id,))
+        response = self.client.post(f'{url}?recipes_limit=1')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['is_subscribed'])
+        self.assertEqual(response.data['recipes_count'], 1)
+        self.assertEqual(len(response.data['recipes']), 1)
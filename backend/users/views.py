@@ -1,22 +1,71 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
+from djoser import utils
 from djoser.views import TokenCreateView, UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from foodgram.instrumentation import serialization
 from foodgram.pagination import LimitPageNumberPaginator
-from recipes.serializers import SubscriptionSerializer
+from foodgram.routers import ReplicaReadMixin
+from recipes.batch import add_batch
+from recipes.feed import backfill
+from recipes.models import Recipe
+from recipes.serializers import BatchSerializer, SubscriptionSerializer
+from tasks.queue import enqueue
+from tasks.views import accepted
+from .jobs import delete_user
 from .models import CustomUser, Follow
 from .serializers import CustomUserSerializer
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     """ВьюСет пользователя"""
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (AllowAny, )
     pagination_class = LimitPageNumberPaginator
+    replica_actions = ('list',)
+    query_budgets = {
+        'list': 4,
+        'retrieve': 2,
+        'me': 5,
+        'subscriptions': 4,
+        'subscribe': 8,
+        'subscribe_batch': 8,
+    }
+    throttle_scopes = {
+        'create': 'write',
+        'subscribe': 'write',
+        'subscribe_batch': 'write',
+    }
+
+    def destroy(self, request, *args, **kwargs):
+        """Блокирует пользователя сразу, а его рецепты и его самого удаляет
+        фоновая задача"""
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if instance == request.user:
+            utils.logout_user(request)
+        instance.is_blocked = True
+        instance.save(update_fields=['is_blocked'])
+        return accepted(request, enqueue(delete_user, instance.pk,
+                                         user=request.user))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ('list', 'retrieve') and user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return queryset
 
     @action(
         methods=['GET'],
@@ -26,14 +75,27 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(
+            user=user).with_author_stats().order_by('-id')
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context=self.get_subscription_context(pages)
         )
-        return self.get_paginated_response(serializer.data)
+        with serialization():
+            return self.get_paginated_response(serializer.data)
+
+    def get_subscription_context(self, follows):
+        """Загружает превью рецептов всех авторов страницы одним запросом"""
+        limit = self.request.query_params.get('recipes_limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.limited_per_author(
+            {follow.author_id for follow in follows}, limit
+        ):
+            recipes[recipe.author_id].append(recipe)
+        return {'request': self.request, 'recipes': recipes}
 
     @action(
         methods=['POST', 'DELETE'],
@@ -54,10 +116,13 @@ class CustomUserViewSet(UserViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             follow = Follow.objects.create(user=user, author=author)
+            follow = Follow.objects.with_author_stats().get(pk=follow.pk)
             serializer = SubscriptionSerializer(
-                follow, context={'request': request}
+                follow, context=self.get_subscription_context([follow])
             )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            with serialization():
+                data = serializer.data
+            return Response(data, status=status.HTTP_201_CREATED)
         if user == author:
             return Response(
                 {'errors': 'Вы не можете отписаться от самого себя'},
@@ -72,6 +137,27 @@ class CustomUserViewSet(UserViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='subscribe/batch',
+        url_name='subscribe-batch'
+    )
+    def subscribe_batch(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        with transaction.atomic():
+            created, results = add_batch(
+                Follow, 'author', user, CustomUser.objects.all(),
+                serializer.validated_data['ids'],
+                errors={user.id: 'Вы не можете подписываться на самого себя'}
+            )
+            if created:
+                backfill(user.id, created)
+        return Response({'results': results})
+
 
 class CheckBlockAndTokenCreate(TokenCreateView):
     """Вью для проверки пользователя на блокировку"""